@@ -1,4 +1,5 @@
 import axios from 'axios';
+import crypto from 'crypto';
 import mongoose from 'mongoose';
 import foodModel from '../models/foodModel.js';
 import userModel from '../models/userModel.js';
@@ -7,6 +8,21 @@ import recommendedFoodsModel from '../models/recommendedFoodsModel.js';
 // ML Service URL - configure in .env
 const ML_SERVICE_URL = process.env.ML_SERVICE_URL || 'http://localhost:5001';
 
+// Catalog registered with the ML service, reused while the menu is unchanged
+let registeredCatalog = { signature: null, version: null };
+
+// Register the menu with the ML service and remember its catalog version
+const registerCatalog = async (catalogFoods, signature) => {
+  const response = await axios.post(
+    `${ML_SERVICE_URL}/api/ml/catalog`,
+    { foods: catalogFoods },
+    { timeout: 10000 }
+  );
+  registeredCatalog = { signature, version: response.data.catalogVersion };
+  console.log('   - Catalog registered:', registeredCatalog.version);
+  return registeredCatalog.version;
+};
+
 // Get food recommendations based on user's health profile
 const getFoodRecommendations = async (req, res) => {
   try {
@@ -50,30 +66,51 @@ const getFoodRecommendations = async (req, res) => {
     
     console.log('   - Total foods available:', foods.length);
     
-    // Prepare data for ML service using stored health profile
-    const mlRequest = {
-      healthProfile: {
-        conditions: user.healthProfile.conditions || {}
-      },
-      foods: foods.map(food => ({
-        _id: food._id,
-        name: food.name,
-        description: food.description,
-        category: food.category,
-        price: food.price,
-        image: food.image,
-        nutritionalInfo: food.nutritionalInfo
-      })),
-      topN: req.body.topN || 20
-    };
+    // Menu sent to the ML service only when it changes
+    const catalogFoods = foods.map(food => ({
+      _id: food._id,
+      name: food.name,
+      description: food.description,
+      category: food.category,
+      price: food.price,
+      image: food.image,
+      nutritionalInfo: food.nutritionalInfo
+    }));
+    const signature = crypto
+      .createHash('sha256')
+      .update(JSON.stringify(catalogFoods))
+      .digest('hex');
+    
+    let catalogVersion = registeredCatalog.signature === signature
+      ? registeredCatalog.version
+      : await registerCatalog(catalogFoods, signature);
     
-    // Call ML service
-    const mlResponse = await axios.post(
+    // Prepare data for ML service using stored health profile
+    const requestRecommendations = (version) => axios.post(
       `${ML_SERVICE_URL}/api/ml/recommend-foods`,
-      mlRequest,
+      {
+        healthProfile: {
+          conditions: user.healthProfile.conditions || {}
+        },
+        catalogVersion: version,
+        topN: req.body.topN || 20
+      },
       { timeout: 10000 }
     );
     
+    // Call ML service
+    let mlResponse;
+    try {
+      mlResponse = await requestRecommendations(catalogVersion);
+    } catch (error) {
+      // ML service restarted or dropped the catalog: register it again and retry once
+      if (error.response?.status !== 404) {
+        throw error;
+      }
+      catalogVersion = await registerCatalog(catalogFoods, signature);
+      mlResponse = await requestRecommendations(catalogVersion);
+    }
+    
     const recommendationsData = {
       recommendations: mlResponse.data.recommendations,
       activeConditions: mlResponse.data.activeConditions,
@@ -176,6 +213,50 @@ const predictFoodSuitability = async (req, res) => {
   }
 };
 
+// Predict suitability for many foods at once (e.g. a catalog import)
+const predictFoodSuitabilityBatch = async (req, res) => {
+  try {
+    const { foods } = req.body;
+    
+    if (!Array.isArray(foods) || foods.length === 0) {
+      return res.json({ 
+        success: false, 
+        message: 'A non-empty foods array is required' 
+      });
+    }
+    
+    // One ML service call for the whole batch
+    const mlResponse = await axios.post(
+      `${ML_SERVICE_URL}/api/ml/predict-food-suitability/batch`,
+      { foods },
+      { timeout: 30000 }
+    );
+    
+    res.json({
+      success: true,
+      results: mlResponse.data.results,
+      totalFoods: mlResponse.data.totalFoods,
+      message: 'Suitability prediction completed'
+    });
+    
+  } catch (error) {
+    console.error('Error predicting batch suitability:', error.message);
+    
+    if (error.code === 'ECONNREFUSED') {
+      return res.json({ 
+        success: false, 
+        message: 'ML service is not available',
+        error: 'ML_SERVICE_UNAVAILABLE'
+      });
+    }
+    
+    res.json({ 
+      success: false, 
+      message: 'Error predicting suitability: ' + (error.response?.data?.error || error.message)
+    });
+  }
+};
+
 // Update user's health profile
 const updateHealthProfile = async (req, res) => {
   try {
@@ -429,6 +510,7 @@ const getSavedRecommendations = async (req, res) => {
 export { 
   getFoodRecommendations, 
   predictFoodSuitability, 
+  predictFoodSuitabilityBatch,
   updateHealthProfile,
   getHealthProfile,
   calculateBMI,
@@ -2,6 +2,7 @@ import express from 'express';
 import { 
   getFoodRecommendations, 
   predictFoodSuitability,
+  predictFoodSuitabilityBatch,
   updateHealthProfile,
   getHealthProfile,
   calculateBMI,
@@ -21,6 +22,9 @@ mlRouter.post('/recommendations/get', authMiddleware, getSavedRecommendations);
 // Predict food suitability (for admin when adding food)
 mlRouter.post('/predict-suitability', authMiddleware, predictFoodSuitability);
 
+// Predict suitability for a batch of foods in one call
+mlRouter.post('/predict-suitability/batch', authMiddleware, predictFoodSuitabilityBatch);
+
 // Update user's health profile
 mlRouter.post('/health-profile/update', authMiddleware, updateHealthProfile);
 
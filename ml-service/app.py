@@ -1,50 +1,360 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
-import joblib
 import numpy as np
+import csv
+import hmac
+import io
 import os
 import sys
+import time
+
+import featurizer
+import metrics
+import wire
+from batching import MicroBatcher
+from catalog import CatalogStore
+from config import Config
+from model_store import ModelStore
+from ranking_cache import RankingCache
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for React frontend
 
+@app.before_request
+def _start_request_timer():
+    # Registered first, so request latency and the parse stage include body decoding
+    g.request_start = time.perf_counter()
+
+wire.init_app(app)  # orjson / MessagePack bodies, gzip / zstd responses
+
 # Configuration
 MODEL_DIR = 'models'
-model = None
-scaler = None
-feature_cols = None
+
+# Column of each health condition in the model output
+CONDITION_MAP = {
+    'diabetes': 0,
+    'hypertension': 1,
+    'heartDisease': 2,
+    'highCholesterol': 3,
+    'obesity': 4,
+    'kidneyDisease': 5
+}
+
+def _predict(current, feature_matrix, timer=None):
+    """Scale a feature matrix (unless the model takes raw features) and predict every row"""
+    metrics.BATCH_FOODS.observe(len(feature_matrix), endpoint=timer.endpoint if timer else 'catalog')
+    batcher = current.batcher
+    if timer and batcher is not None and len(feature_matrix) < batcher.max_rows:
+        # Shares one model call with concurrent requests
+        predictions = batcher.predict(feature_matrix)
+        timer.mark('predict')
+        return predictions
+    
+    if current.scaler is not None:
+        feature_matrix = current.scaler.transform(feature_matrix)
+        if timer:
+            timer.mark('scale')
+    predictions = current.model.predict(feature_matrix)
+    if timer:
+        timer.mark('predict')
+    return predictions
+
+def _top_indices(suitable_count, top_n):
+    """
+    Indices of the top_n highest counts, ties broken by catalog order.
+    Uses partial selection so only the winners are sorted.
+    """
+    n_foods = len(suitable_count)
+    # Same slice semantics as list[:top_n]
+    k = len(range(n_foods)[:top_n])
+    if k == 0:
+        return np.empty(0, dtype=np.intp)
+    
+    # Unique integer keys: higher count first, then lower index
+    keys = (suitable_count.max() - suitable_count).astype(np.int64) * n_foods + np.arange(n_foods)
+    if k < n_foods:
+        winners = np.argpartition(keys, k - 1)[:k]
+        return winners[np.argsort(keys[winners])]
+    return np.argsort(keys)
+
+def _rank_foods(predictions, active_conditions, top_n):
+    """
+    Indices and response scores of the top_n most suitable foods.
+    The score is the percentage of active conditions a food is suitable for;
+    unknown condition names count towards the total but never match.
+    """
+    if not active_conditions:
+        order = np.arange(len(predictions))[:top_n]
+        return order, [100] * len(order)
+    
+    columns = [CONDITION_MAP[cond] for cond in active_conditions if cond in CONDITION_MAP]
+    suitable_count = predictions[:, columns].sum(axis=1)
+    order = _top_indices(suitable_count, top_n)
+    scores = np.round((suitable_count[order] / len(active_conditions)) * 100, 2)
+    return order, scores.tolist()
+
+def _iter_ranked(predictions, active_conditions, top_n, chunk_size):
+    """
+    Same ranking as _rank_foods, produced in chunks of (indices, scores).
+    Counts only take len(conditions) + 1 values, so foods are emitted bucket
+    by bucket in catalog order instead of sorting the whole catalog.
+    """
+    k = len(range(len(predictions))[:top_n])
+    if not active_conditions:
+        for start in range(0, k, chunk_size):
+            stop = min(start + chunk_size, k)
+            yield np.arange(start, stop), [100] * (stop - start)
+        return
+    
+    columns = [CONDITION_MAP[cond] for cond in active_conditions if cond in CONDITION_MAP]
+    suitable_count = predictions[:, columns].sum(axis=1)
+    for count in range(len(columns), -1, -1):
+        if k <= 0:
+            return
+        indices = np.flatnonzero(suitable_count == count)[:k]
+        k -= len(indices)
+        score = np.round((count / len(active_conditions)) * 100, 2).item()
+        for start in range(0, len(indices), chunk_size):
+            chunk = indices[start:start + chunk_size]
+            yield chunk, [score] * len(chunk)
+
+def _ndjson_response(lines):
+    """Stream an iterable of JSON-serializable objects as NDJSON"""
+    def generate():
+        for line in lines:
+            yield wire.dumps_line(line)
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+def _invalid_food(error):
+    """400 response for a food that cannot be scored"""
+    return jsonify({
+        'success': False,
+        'error': str(error),
+        'code': 'INVALID_FOOD'
+    }), 400
+
+def _stream_requested():
+    return request.args.get('stream', '').lower() in ('1', 'true', 'yes')
+
+def _food_record(food, score):
+    """Recommendation dict for a food sent in the request body (same shape as FoodCatalog.records)"""
+    return {
+        'foodId': food.get('_id'),
+        'name': food.get('name'),
+        'category': food.get('category'),
+        'suitabilityScore': score,
+        'nutritionalInfo': food.get('nutritionalInfo', {}),
+        'image': food.get('image'),
+        'price': food.get('price'),
+        'description': food.get('description', '')
+    }
+
+def _stream_recommendations(active_conditions, total_foods, top_n, ranked_records):
+    """
+    NDJSON recommend-foods response: a summary line, then one line per food.
+    ranked_records() is only called once the summary has been sent, so the
+    client gets its first bytes before any food is scored.
+    """
+    def lines():
+        yield {
+            'success': True,
+            'activeConditions': active_conditions,
+            'totalFoods': total_foods
+        }
+        for records in ranked_records():
+            yield from records
+    return _ndjson_response(lines())
+
+def _suitability_results(predictions):
+    """Per-food suitability scores (0-10 scale) and notes for prediction rows"""
+    results = []
+    for row in (predictions.astype(int) * 10).tolist():
+        recommendations = []
+        # Add recommendations based on scores
+        if row[0] == 10:
+            recommendations.append('Suitable for diabetic patients')
+        if row[1] == 10:
+            recommendations.append('Suitable for hypertension patients')
+        if row[2] == 10:
+            recommendations.append('Heart-healthy option')
+        results.append({
+            'suitabilityScores': {
+                'diabetes': row[0],
+                'hypertension': row[1],
+                'heartDisease': row[2],
+                'highCholesterol': row[3],
+                'obesity': row[4],
+                'kidneyDisease': row[5]
+            },
+            'recommendations': recommendations
+        })
+    return results
+
+def _foods_from_csv(text):
+    """Food dicts from CSV rows shaped like food_health_dataset.csv"""
+    def number(value):
+        return float(value) if value not in (None, '') else 0
+    
+    foods = []
+    for row in csv.DictReader(io.StringIO(text)):
+        foods.append({
+            '_id': row.get('food_id') or row.get('_id'),
+            'name': row.get('food_name') or row.get('name'),
+            'category': row.get('category') or 'Grilled Items',
+            'nutritionalInfo': {
+                'calories': number(row.get('calories')),
+                'protein': number(row.get('protein')),
+                'carbohydrates': number(row.get('carbohydrates'))
+            }
+        })
+    return foods
+
+def _precompute_suitability(catalog):
+    """Suitability of a newly loaded catalog under the active model"""
+    current = model_store.active
+    if current is not None and len(catalog):
+        metrics.BATCH_FOODS.observe(len(catalog), endpoint='catalog')
+        current.suitability(catalog)
+
+def _forget_catalog(catalog_version):
+    ranking_cache.invalidate(catalog_version)
+    current = model_store.active
+    if current is not None:
+        current.forget(catalog_version)
+
+# Ranked results per (catalog, model, condition set, topN)
+ranking_cache = RankingCache()
+
+# Registered food catalogs
+catalog_store = CatalogStore(
+    on_load=_precompute_suitability,
+    on_evict=_forget_catalog
+)
+
+# (window_ms, max_rows) once enable_micro_batching() has been called
+micro_batching = None
+
+def enable_micro_batching(window_ms=Config.MICRO_BATCH_WINDOW_MS,
+                          max_rows=Config.MICRO_BATCH_MAX_ROWS):
+    """Batch the predictions of requests that arrive within window_ms"""
+    global micro_batching
+    micro_batching = (window_ms, max_rows)
+    current = model_store.active
+    if current is not None:
+        current.batcher = MicroBatcher(current.predict, window_ms, max_rows)
+    print(f"✓ Micro-batching enabled ({window_ms} ms window, up to {max_rows} rows)")
+
+model_swaps = metrics.Counter('ml_model_swaps_total', 'Models swapped in by hot reload')
+
+def _warm_model(candidate):
+    """Prepare a newly loaded model before it serves requests"""
+    # First prediction, then suitability for every catalog in memory
+    candidate.predict(np.zeros((1, len(candidate.feature_cols))))
+    for catalog in catalog_store.catalogs():
+        if len(catalog):
+            candidate.suitability(catalog)
+    if micro_batching is not None:
+        candidate.batcher = MicroBatcher(candidate.predict, *micro_batching)
+
+def _on_model_swap(previous, current):
+    # Rankings of the previous model will never be looked up again
+    ranking_cache.invalidate()
+    if previous is not None:
+        model_swaps.inc()
+
+# Active model snapshot, swapped atomically on reload
+model_store = ModelStore(MODEL_DIR, warm_fn=_warm_model, on_swap=_on_model_swap)
 
 def load_models():
     """Load ML models on startup"""
-    global model, scaler, feature_cols
-    
-    try:
-        model_path = os.path.join(MODEL_DIR, 'food_recommendation_model.pkl')
-        scaler_path = os.path.join(MODEL_DIR, 'feature_scaler.pkl')
-        features_path = os.path.join(MODEL_DIR, 'feature_columns.pkl')
-        
-        if os.path.exists(model_path):
-            model = joblib.load(model_path)
-            scaler = joblib.load(scaler_path)
-            feature_cols = joblib.load(features_path)
-            print("✓ ML Models loaded successfully!")
-        else:
-            print("⚠ Warning: Model files not found. Please train the model first.")
-            print(f"Expected path: {model_path}")
-    except Exception as e:
-        print(f"✗ Error loading models: {str(e)}")
+    model_store.reload(wait=True)
 
 # Load models on startup
 load_models()
 
+if Config.MICRO_BATCHING:
+    enable_micro_batching()
+
+# Pick up models written to MODEL_DIR while running
+if Config.MODEL_WATCH_INTERVAL > 0:
+    model_store.start_watching(Config.MODEL_WATCH_INTERVAL)
+
+@app.before_request
+def _take_model_snapshot():
+    # Each request uses a single model from start to finish
+    current = model_store.active
+    g.model = current
+    g.batcher = current.batcher if current is not None else None
+    if g.batcher is not None:
+        g.batcher.request_started()
+
+@app.teardown_request
+def _release_model_snapshot(exc):
+    batcher = g.pop('batcher', None)
+    if batcher is not None:
+        batcher.request_finished()
+
+metrics.Counter(
+    'ml_ranking_cache_hits_total', 'Ranking cache hits',
+    callback=lambda: ranking_cache.stats()['hits']
+)
+metrics.Counter(
+    'ml_ranking_cache_misses_total', 'Ranking cache misses',
+    callback=lambda: ranking_cache.stats()['misses']
+)
+metrics.Gauge(
+    'ml_ranking_cache_hit_ratio', 'Ranking cache hits / lookups since start',
+    callback=lambda: ranking_cache.stats()['hitRate']
+)
+metrics.Gauge(
+    'ml_ranking_cache_entries', 'Rankings held in the cache',
+    callback=lambda: ranking_cache.stats()['size']
+)
+metrics.Gauge(
+    'ml_ranking_cache_records', 'Recommendation records held across cached rankings',
+    callback=lambda: ranking_cache.stats()['records']
+)
+metrics.Gauge(
+    'ml_registered_catalog_foods', 'Foods in each registered catalog held in memory',
+    ('catalog',), callback=lambda: {(version,): size for version, size in catalog_store.sizes().items()}
+)
+metrics.Gauge(
+    'ml_model_info', 'Active model version (always 1)',
+    ('version',), callback=lambda: {(model_store.active.version,): 1} if model_store.active else {}
+)
+metrics.Gauge(
+    'ml_model_loaded_timestamp_seconds', 'When the active model was loaded (Unix time)',
+    callback=lambda: model_store.active.loaded_at.timestamp() if model_store.active else 0
+)
+
+@app.after_request
+def _record_request(response):
+    # Streamed responses are counted when their headers are sent
+    endpoint = request.endpoint or 'unmatched'
+    metrics.REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+    start = g.get('request_start')
+    if start is not None:
+        metrics.REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint)
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus text format metrics: stage latencies, counts, sizes, cache"""
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    models_loaded = model is not None and scaler is not None
+    current = model_store.active
     return jsonify({
         'status': 'healthy',
         'message': 'ML Service is running',
-        'models_loaded': models_loaded
+        'models_loaded': current is not None,
+        'model_version': current.version if current else None,
+        'model_loaded_at': current.loaded_at.isoformat() if current else None,
+        'model_reload_error': model_store.last_error,
+        'ranking_cache': ranking_cache.stats(),
+        'codecs': wire.available_codecs()
     }), 200
 
 @app.route('/api/ml/recommend-foods', methods=['POST'])
@@ -64,6 +374,7 @@ def recommend_foods():
                 "kidneyDisease": false
             }
         },
+        "catalogVersion": "9f86d081884c7d65",  // from /api/ml/catalog, or:
         "foods": [
             {
                 "_id": "123",
@@ -80,13 +391,18 @@ def recommend_foods():
         ],
         "topN": 10
     }
+    
+    Add ?stream=true for an NDJSON response: a first line with success,
+    activeConditions and totalFoods, then one recommendation per line.
     """
     try:
-        if model is None or scaler is None:
+        current = g.model
+        if current is None:
             return jsonify({
                 'error': 'Models not loaded. Please train the model first.'
             }), 500
         
+        timer = metrics.StageTimer('recommend_foods', start=g.request_start)
         data = request.json
         health_profile = data.get('healthProfile', {})
         conditions = health_profile.get('conditions', {})
@@ -98,87 +414,159 @@ def recommend_foods():
             cond for cond, has_it in conditions.items() if has_it
         ]
         
-        # Category encoding map
-        category_map = {
-            'Salads & Greens': 0,
-            'Low-Carb Meals': 1,
-            'High-Protein': 2,
-            'Heart-Healthy': 3,
-            'Diabetic-Friendly': 4,
-            'Whole Grains': 5,
-            'Lean Protein': 6,
-            'Vegetarian': 7,
-            'Soups': 8,
-            'Grilled Items': 9
-        }
-        
-        recommendations = []
+        catalog_version = data.get('catalogVersion')
+        timer.mark('parse')
         
-        for food in foods:
-            nutritional_info = food.get('nutritionalInfo', {})
-            
-            # Create feature array
-            features = {
-                'calories': nutritional_info.get('calories', 0),
-                'protein': nutritional_info.get('protein', 0),
-                'carbohydrates': nutritional_info.get('carbohydrates', 0),
-                'category_encoded': category_map.get(food.get('category', 'Grilled Items'), 9)
-            }
+        if catalog_version is not None:
+            # Registered catalog: typed columns, no per-food parsing
+            catalog = catalog_store.get(str(catalog_version))
+            if catalog is None:
+                return jsonify({
+                    'success': False,
+                    'error': f'Unknown catalog version: {catalog_version}',
+                    'code': 'CATALOG_NOT_FOUND'
+                }), 404
+            metrics.CATALOG_FOODS.observe(len(catalog), endpoint='recommend_foods')
+            timer.mark('featurize')
             
-            # Ensure we have all required features
-            feature_array = np.array([[features.get(col, 0) for col in feature_cols]])
-            
-            # Scale and predict
-            features_scaled = scaler.transform(feature_array)
-            predictions = model.predict(features_scaled)[0]
-            
-            # Calculate suitability score
-            condition_map = {
-                'diabetes': 0,
-                'hypertension': 1,
-                'heartDisease': 2,
-                'highCholesterol': 3,
-                'obesity': 4,
-                'kidneyDisease': 5
-            }
+            cache_key = RankingCache.make_key(
+                catalog.version, current.version, active_conditions, top_n
+            )
             
-            if not active_conditions:
-                suitability_score = 100
-            else:
-                suitable_count = sum(
-                    predictions[condition_map[cond]] for cond in active_conditions
-                    if cond in condition_map
+            if _stream_requested():
+                # Streamed chunk by chunk; cached afterwards if it fits the cache
+                def ranked_records():
+                    cached = ranking_cache.get(cache_key)
+                    if cached is not None:
+                        yield cached
+                        return
+                    ranking = []
+                    if len(catalog):
+                        for order, scores in _iter_ranked(current.suitability(catalog), active_conditions,
+                                                          top_n, Config.STREAM_CHUNK_SIZE):
+                            records = catalog.records(order, scores)
+                            if ranking is not None:
+                                ranking.extend(records)
+                                if not ranking_cache.fits(len(ranking)):
+                                    ranking = None
+                            yield records
+                    if ranking is not None:
+                        ranking_cache.put(cache_key, ranking)
+                return _stream_recommendations(
+                    active_conditions, len(catalog), top_n, ranked_records
                 )
-                suitability_score = (suitable_count / len(active_conditions)) * 100
             
-            recommendations.append({
-                'foodId': food.get('_id'),
-                'name': food.get('name'),
-                'category': food.get('category'),
-                'suitabilityScore': round(suitability_score, 2),
-                'nutritionalInfo': nutritional_info,
-                'image': food.get('image'),
-                'price': food.get('price'),
-                'description': food.get('description', '')
-            })
+            recommendations = ranking_cache.get(cache_key)
+            if recommendations is None:
+                recommendations = []
+                if len(catalog):
+                    order, scores = _rank_foods(current.suitability(catalog), active_conditions, top_n)
+                    timer.mark('rank')
+                    recommendations = catalog.records(order, scores)
+                ranking_cache.put(cache_key, recommendations)
+            total_foods = len(catalog)
+        elif _stream_requested():
+            metrics.CATALOG_FOODS.observe(len(foods), endpoint='recommend_foods')
+            # Featurized up front, so an invalid food is a 400 and not a broken stream
+            feature_matrix = featurizer.features_from_foods(foods, current.feature_cols)
+            timer.mark('featurize')
+            
+            def ranked_records():
+                if not foods:
+                    return
+                timer.skip()
+                predictions = _predict(current, feature_matrix, timer)
+                for order, scores in _iter_ranked(predictions, active_conditions,
+                                                  top_n, Config.STREAM_CHUNK_SIZE):
+                    yield [_food_record(foods[idx], score) for idx, score in zip(order, scores)]
+            return _stream_recommendations(
+                active_conditions, len(foods), top_n, ranked_records
+            )
+        else:
+            metrics.CATALOG_FOODS.observe(len(foods), endpoint='recommend_foods')
+            recommendations = []
+            if foods:
+                # Build one feature matrix for the whole catalog
+                feature_matrix = featurizer.features_from_foods(foods, current.feature_cols)
+                timer.mark('featurize')
+                
+                predictions = _predict(current, feature_matrix, timer)
+                order, scores = _rank_foods(predictions, active_conditions, top_n)
+                timer.mark('rank')
+                
+                recommendations = [
+                    _food_record(foods[idx], score) for idx, score in zip(order, scores)
+                ]
+            total_foods = len(foods)
         
-        # Sort by suitability score
-        recommendations.sort(key=lambda x: x['suitabilityScore'], reverse=True)
+        response = jsonify({
+            'success': True,
+            'recommendations': recommendations,
+            'activeConditions': active_conditions,
+            'totalFoods': total_foods
+        })
+        timer.mark('serialize')
+        return response, 200
+        
+    except featurizer.InvalidFoodError as e:
+        return _invalid_food(e)
+    except Exception as e:
+        print(f"Error in recommend_foods: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/ml/catalog', methods=['POST'])
+def register_catalog():
+    """
+    Register (or replace) the food catalog used by recommend-foods
+    
+    Request body:
+    {
+        "foods": [ ...same shape as the recommend-foods "foods" list... ]
+    }
+    
+    The returned catalogVersion is a content hash: registering the same
+    menu again yields the same version.
+    """
+    try:
+        data = request.json
+        foods = data.get('foods', [])
+        catalog = catalog_store.register(foods)
         
         return jsonify({
             'success': True,
-            'recommendations': recommendations[:top_n],
-            'activeConditions': active_conditions,
-            'totalFoods': len(foods)
+            'catalogVersion': catalog.version,
+            'totalFoods': len(catalog)
         }), 200
         
+    except featurizer.InvalidFoodError as e:
+        return _invalid_food(e)
     except Exception as e:
-        print(f"Error in recommend_foods: {str(e)}")
+        print(f"Error in register_catalog: {str(e)}")
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
+@app.route('/api/ml/catalog/<version>', methods=['GET'])
+def get_catalog(version):
+    """Check whether a catalog version is registered"""
+    catalog = catalog_store.get(version)
+    if catalog is None:
+        return jsonify({
+            'success': False,
+            'error': f'Unknown catalog version: {version}',
+            'code': 'CATALOG_NOT_FOUND'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'catalogVersion': catalog.version,
+        'totalFoods': len(catalog)
+    }), 200
+
 @app.route('/api/ml/predict-food-suitability', methods=['POST'])
 def predict_food_suitability():
     """
@@ -195,66 +583,34 @@ def predict_food_suitability():
     }
     """
     try:
-        if model is None or scaler is None:
+        current = g.model
+        if current is None:
             return jsonify({
                 'error': 'Models not loaded. Please train the model first.'
             }), 500
         
+        timer = metrics.StageTimer('predict_food_suitability', start=g.request_start)
         data = request.json
-        nutritional_info = data.get('nutritionalInfo', {})
-        
-        # Category encoding map
-        category_map = {
-            'Salads & Greens': 0,
-            'Low-Carb Meals': 1,
-            'High-Protein': 2,
-            'Heart-Healthy': 3,
-            'Diabetic-Friendly': 4,
-            'Whole Grains': 5,
-            'Lean Protein': 6,
-            'Vegetarian': 7,
-            'Soups': 8,
-            'Grilled Items': 9
-        }
-        
-        features = {
-            'calories': nutritional_info.get('calories', 0),
-            'protein': nutritional_info.get('protein', 0),
-            'carbohydrates': nutritional_info.get('carbohydrates', 0),
-            'category_encoded': category_map.get(data.get('category', 'Grilled Items'), 9)
-        }
+        timer.mark('parse')
         
         # Create feature array
-        feature_array = np.array([[features.get(col, 0) for col in feature_cols]])
+        feature_array = featurizer.features_from_foods([data], current.feature_cols)
+        timer.mark('featurize')
         
         # Scale and predict
-        features_scaled = scaler.transform(feature_array)
-        predictions = model.predict(features_scaled)[0]
+        predictions = _predict(current, feature_array, timer)
         
-        # Create response with scores (0-10 scale)
         result = {
             'success': True,
-            'suitabilityScores': {
-                'diabetes': int(predictions[0]) * 10,
-                'hypertension': int(predictions[1]) * 10,
-                'heartDisease': int(predictions[2]) * 10,
-                'highCholesterol': int(predictions[3]) * 10,
-                'obesity': int(predictions[4]) * 10,
-                'kidneyDisease': int(predictions[5]) * 10
-            },
-            'recommendations': []
+            **_suitability_results(predictions)[0]
         }
         
-        # Add recommendations based on scores
-        if int(predictions[0]) == 1:
-            result['recommendations'].append('Suitable for diabetic patients')
-        if int(predictions[1]) == 1:
-            result['recommendations'].append('Suitable for hypertension patients')
-        if int(predictions[2]) == 1:
-            result['recommendations'].append('Heart-healthy option')
-        
-        return jsonify(result), 200
+        response = jsonify(result)
+        timer.mark('serialize')
+        return response, 200
         
+    except featurizer.InvalidFoodError as e:
+        return _invalid_food(e)
     except Exception as e:
         print(f"Error in predict_food_suitability: {str(e)}")
         return jsonify({
@@ -262,6 +618,138 @@ def predict_food_suitability():
             'error': str(e)
         }), 500
 
+@app.route('/api/ml/predict-food-suitability/batch', methods=['POST'])
+def predict_food_suitability_batch():
+    """
+    Predict suitability for many foods with one vectorized model call
+    
+    Request body, either JSON:
+    {
+        "foods": [
+            {
+                "_id": "123",
+                "name": "Grilled Chicken",
+                "nutritionalInfo": {"calories": 250, "protein": 35, "carbohydrates": 15},
+                "category": "Lean Protein"
+            }
+        ]
+    }
+    or CSV (Content-Type: text/csv, or an uploaded "file") with the columns of
+    food_health_dataset.csv: food_id, food_name, category, calories, protein,
+    carbohydrates (other columns are ignored).
+    
+    Add ?stream=true to receive NDJSON, one result per line.
+    """
+    try:
+        current = g.model
+        if current is None:
+            return jsonify({
+                'error': 'Models not loaded. Please train the model first.'
+            }), 500
+        
+        timer = metrics.StageTimer('predict_food_suitability_batch', start=g.request_start)
+        try:
+            if 'file' in request.files:
+                foods = _foods_from_csv(request.files['file'].read().decode('utf-8-sig'))
+            elif request.mimetype == 'text/csv':
+                foods = _foods_from_csv(request.get_data(as_text=True))
+            else:
+                foods = None
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': f'Invalid CSV: {str(e)}'
+            }), 400
+        
+        if foods is None:
+            foods = (request.json or {}).get('foods', [])
+        timer.mark('parse')
+        
+        if not isinstance(foods, list):
+            return jsonify({
+                'success': False,
+                'error': 'foods must be a list'
+            }), 400
+        
+        if len(foods) > Config.MAX_BATCH_SIZE:
+            return jsonify({
+                'success': False,
+                'error': f'Batch too large: {len(foods)} foods (max {Config.MAX_BATCH_SIZE})'
+            }), 413
+        
+        results = []
+        if foods:
+            feature_matrix = featurizer.features_from_foods(foods, current.feature_cols)
+            timer.mark('featurize')
+            results = _suitability_results(_predict(current, feature_matrix, timer))
+            for food, result in zip(foods, results):
+                result['foodId'] = food.get('_id')
+                result['name'] = food.get('name')
+        
+        if _stream_requested():
+            return _ndjson_response(results)
+        
+        response = jsonify({
+            'success': True,
+            'results': results,
+            'totalFoods': len(foods)
+        })
+        timer.mark('serialize')
+        return response, 200
+        
+    except featurizer.InvalidFoodError as e:
+        return _invalid_food(e)
+    except Exception as e:
+        print(f"Error in predict_food_suitability_batch: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/ml/admin/reload-model', methods=['POST'])
+def reload_model():
+    """
+    Reload the model files from MODEL_DIR without restarting
+    
+    Requires "Authorization: Bearer <MODEL_RELOAD_TOKEN>". The new model is
+    loaded and warmed up in the background, then swapped in; add ?wait=true
+    to respond once it is active. Other worker processes pick the files up
+    through the model directory watcher.
+    """
+    if not Config.MODEL_RELOAD_TOKEN:
+        return jsonify({
+            'success': False,
+            'error': 'Model reload endpoint is disabled (set MODEL_RELOAD_TOKEN)'
+        }), 404
+    
+    supplied = request.headers.get('Authorization', '').encode('utf-8')
+    expected = f'Bearer {Config.MODEL_RELOAD_TOKEN}'.encode('utf-8')
+    if not hmac.compare_digest(supplied, expected):
+        return jsonify({
+            'success': False,
+            'error': 'Unauthorized'
+        }), 401
+    
+    if request.args.get('wait', '').lower() not in ('1', 'true', 'yes'):
+        model_store.reload()
+        return jsonify({
+            'success': True,
+            'message': 'Model reload started'
+        }), 202
+    
+    current = model_store.reload(wait=True)
+    if model_store.last_error is not None:
+        return jsonify({
+            'success': False,
+            'error': model_store.last_error,
+            'modelVersion': current.version if current else None
+        }), 500
+    return jsonify({
+        'success': True,
+        'modelVersion': current.version if current else None,
+        'loadedAt': current.loaded_at.isoformat() if current else None
+    }), 200
+
 @app.route('/api/ml/calculate-bmi', methods=['POST'])
 def calculate_bmi():
     """
@@ -0,0 +1,179 @@
+"""
+Async (ASGI) serving mode with request micro-batching
+
+Runs the Flask app behind an asyncio server. The event loop accepts and reads
+requests; the Flask handlers run on a pool of ASGI_THREADS threads, and the
+predictions of requests arriving within MICRO_BATCH_WINDOW_MS are combined
+into a single model call (see batching.py). Streamed (NDJSON) responses are
+forwarded chunk by chunk. When the client disconnects, the handler stops at
+its next chunk and its thread returns to the pool.
+
+asgiref's WsgiToAsgi runs every request on one thread, which would serialize
+the handlers and leave nothing to batch, so the adapter is defined here.
+
+Usage (from ml-service/):
+    uvicorn asgi:application --host 0.0.0.0 --port 5001
+"""
+
+import asyncio
+import io
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import app as service
+from config import Config
+
+# Queued response chunks per request; bounds memory for slow clients
+RESPONSE_QUEUE_SIZE = 16
+
+
+class ClientDisconnected(Exception):
+    """Raised in the handler thread once the client has gone away"""
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+def _environ(scope, body):
+    """WSGI environ for an ASGI HTTP scope"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+        # The body is already buffered, so a chunked request reads like a sized one
+        'wsgi.input_terminated': True
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE' or name == 'CONTENT_LENGTH':
+            key = name
+        else:
+            key = f'HTTP_{name}'
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    environ['CONTENT_LENGTH'] = str(len(body))
+    environ.pop('HTTP_TRANSFER_ENCODING', None)
+    return environ
+
+
+class FlaskASGI:
+    """ASGI application that runs a WSGI app on a thread pool"""
+
+    def __init__(self, wsgi_app, threads=Config.ASGI_THREADS):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='flask')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+        else:
+            raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _http(self, scope, receive, send):
+        body = bytearray()
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=RESPONSE_QUEUE_SIZE)
+        cancelled = threading.Event()
+
+        def put(message):
+            # Called from the worker thread; blocks while the queue is full
+            if cancelled.is_set():
+                raise ClientDisconnected()
+            asyncio.run_coroutine_threadsafe(queue.put(message), loop).result()
+
+        def run():
+            def start_response(status, headers, exc_info=None):
+                put({
+                    'type': 'http.response.start',
+                    'status': int(status.split(' ', 1)[0]),
+                    'headers': [
+                        (name.lower().encode('latin-1'), value.encode('latin-1'))
+                        for name, value in headers
+                    ]
+                })
+
+            try:
+                try:
+                    result = self.wsgi_app(_environ(scope, bytes(body)), start_response)
+                    try:
+                        for chunk in result:
+                            if chunk:
+                                put({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                    finally:
+                        # Also runs the Flask teardown of an abandoned stream
+                        if hasattr(result, 'close'):
+                            result.close()
+                finally:
+                    put(None)
+            except ClientDisconnected:
+                pass
+
+        def cancel():
+            # Wakes a put() blocked on the full queue; every later put() raises
+            cancelled.set()
+            while not queue.empty():
+                queue.get_nowait()
+
+        task = loop.run_in_executor(self.executor, run)
+        disconnect = asyncio.ensure_future(_wait_for_disconnect(receive))
+        try:
+            while True:
+                get = asyncio.ensure_future(queue.get())
+                await asyncio.wait((get, disconnect), return_when=asyncio.FIRST_COMPLETED)
+                if disconnect.done():
+                    get.cancel()
+                    cancel()
+                    break
+                message = get.result()
+                if message is None:
+                    await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+                    break
+                await send(message)
+        except BaseException:
+            cancel()
+            raise
+        finally:
+            disconnect.cancel()
+            await task
+
+
+service.enable_micro_batching()
+application = FlaskASGI(service.app)
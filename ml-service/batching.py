@@ -0,0 +1,138 @@
+"""
+Request micro-batching for model predictions
+
+Concurrent requests each call MicroBatcher.predict() with their own feature
+rows. The first caller to find the queue empty becomes the leader: it waits
+up to the batching window (or until max_rows rows are queued), stacks every
+queued matrix into one, runs a single prediction and hands each caller its
+slice. Callers that do not fit in the batch are led by the next leader.
+
+The leader only waits while other requests are in flight (tracked through
+request_started() / request_finished()), so a lone request is never delayed.
+
+There is no background thread, so a batcher survives fork() (gunicorn
+preload) and costs nothing while idle.
+"""
+
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+import metrics
+from config import Config
+
+BATCH_REQUESTS = metrics.Histogram(
+    'ml_micro_batch_requests', 'Requests combined into one micro-batched prediction',
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+BATCH_WAIT_SECONDS = metrics.Histogram(
+    'ml_micro_batch_wait_seconds', 'Time a request waited for its micro-batch to run'
+)
+
+
+class _Pending:
+    __slots__ = ('X', 'queued_at', 'result', 'error', 'finished', 'wake')
+
+    def __init__(self, X):
+        self.X = X
+        self.queued_at = time.perf_counter()
+        self.result = None
+        self.error = None
+        self.finished = False
+        # Set when the result is ready or when this caller must lead a batch
+        self.wake = threading.Event()
+
+
+class MicroBatcher:
+    """Combine concurrent predict_fn(X) calls into one call per window"""
+
+    def __init__(self, predict_fn, window_ms=Config.MICRO_BATCH_WINDOW_MS,
+                 max_rows=Config.MICRO_BATCH_MAX_ROWS):
+        self.predict_fn = predict_fn
+        self.window = window_ms / 1000
+        self.max_rows = max_rows
+        self._queue = deque()
+        self._rows = 0
+        self._in_flight = 0
+        self._cond = threading.Condition()
+
+    def request_started(self):
+        with self._cond:
+            self._in_flight += 1
+
+    def request_finished(self):
+        with self._cond:
+            self._in_flight -= 1
+            # The leader may be waiting for this request
+            self._cond.notify_all()
+
+    def predict(self, X):
+        """predict_fn(X), computed together with concurrent callers"""
+        pending = _Pending(X)
+        with self._cond:
+            self._queue.append(pending)
+            self._rows += len(X)
+            lead = len(self._queue) == 1
+            if not lead:
+                # The leader re-checks whether to keep waiting
+                self._cond.notify_all()
+
+        while True:
+            if lead:
+                self._lead()
+            pending.wake.wait()
+            if pending.finished:
+                break
+            # Promoted: the previous leader's batch was full
+            pending.wake.clear()
+            lead = True
+
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _lead(self):
+        deadline = time.monotonic() + self.window
+        with self._cond:
+            # Wait while some in-flight request may still join the batch
+            while self._rows < self.max_rows and self._in_flight > len(self._queue):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch = [self._queue.popleft()]
+            rows = len(batch[0].X)
+            while self._queue and rows + len(self._queue[0].X) <= self.max_rows:
+                batch.append(self._queue.popleft())
+                rows += len(batch[-1].X)
+            self._rows -= rows
+            if self._queue:
+                self._queue[0].wake.set()
+
+        self._run(batch)
+
+    def _run(self, batch):
+        started = time.perf_counter()
+        BATCH_REQUESTS.observe(len(batch))
+        for pending in batch:
+            BATCH_WAIT_SECONDS.observe(started - pending.queued_at)
+
+        try:
+            if len(batch) == 1:
+                results = [self.predict_fn(batch[0].X)]
+            else:
+                predictions = self.predict_fn(np.concatenate([pending.X for pending in batch]))
+                bounds = np.cumsum([len(pending.X) for pending in batch])[:-1]
+                results = np.split(predictions, bounds)
+            for pending, result in zip(batch, results):
+                pending.result = result
+        except Exception as e:
+            for pending in batch:
+                pending.error = e
+        finally:
+            for pending in batch:
+                pending.finished = True
+                pending.wake.set()
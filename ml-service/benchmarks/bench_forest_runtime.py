@@ -0,0 +1,147 @@
+"""
+Benchmark the compiled NumPy forest runtime against the scikit-learn path
+
+Reports cold start time and peak RSS (each path in a fresh process) and the
+per-batch prediction latency, and checks that both paths predict the same.
+
+Usage (from ml-service/):
+    python benchmarks/bench_forest_runtime.py
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+import warnings
+
+import numpy as np
+
+SERVICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+MODEL_DIR = os.path.join(SERVICE_DIR, 'models')
+sys.path.insert(0, SERVICE_DIR)
+
+BATCH_SIZES = [1, 10, 100, 2000, 20000]
+
+# Each cold start snippet loads one path and predicts a single row
+COLD_START = {
+    'sklearn': '''
+import joblib, numpy as np
+model = joblib.load(os.path.join(MODEL_DIR, 'food_recommendation_model.pkl'))
+scaler = joblib.load(os.path.join(MODEL_DIR, 'feature_scaler.pkl'))
+model.predict(scaler.transform(np.array([[250.0, 35.0, 15.0, 6.0]])))
+''',
+    'compiled': '''
+import numpy as np
+from model_artifact import ARTIFACT_FILE, load_model
+model, header = load_model(os.path.join(MODEL_DIR, ARTIFACT_FILE))
+model.predict(np.array([[250.0, 35.0, 15.0, 6.0]]))
+'''
+}
+
+# ru_maxrss survives exec on Linux, so peak RSS is read from VmHWM instead
+COLD_START_TEMPLATE = '''
+import os, sys, time, json, resource, warnings
+warnings.filterwarnings('ignore')
+start = time.perf_counter()
+sys.path.insert(0, {service_dir!r})
+MODEL_DIR = {model_dir!r}
+{body}
+elapsed = time.perf_counter() - start
+max_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if os.path.exists('/proc/self/status'):
+    with open('/proc/self/status') as f:
+        max_rss_kb = next(int(line.split()[1]) for line in f if line.startswith('VmHWM'))
+print(json.dumps({{
+    'seconds': elapsed,
+    'max_rss_mb': max_rss_kb / 1024,
+    'sklearn_imported': 'sklearn' in sys.modules
+}}))
+'''
+
+
+def cold_start(name, repeats=3):
+    """Best-of-N cold start measured in a fresh interpreter"""
+    code = COLD_START_TEMPLATE.format(
+        service_dir=SERVICE_DIR, model_dir=MODEL_DIR, body=COLD_START[name]
+    )
+    runs = []
+    for _ in range(repeats):
+        output = subprocess.run(
+            [sys.executable, '-c', code], capture_output=True, text=True, check=True
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    return min(runs, key=lambda run: run['seconds'])
+
+
+def batch_latency(predict, X, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        predict(X)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def main():
+    import joblib
+    from forest_runtime import CompiledForest, compile_model
+
+    warnings.filterwarnings('ignore')
+    model = joblib.load(os.path.join(MODEL_DIR, 'food_recommendation_model.pkl'))
+    scaler = joblib.load(os.path.join(MODEL_DIR, 'feature_scaler.pkl'))
+    feature_cols = joblib.load(os.path.join(MODEL_DIR, 'feature_columns.pkl'))
+    compiled = CompiledForest(compile_model(model, scaler, feature_cols))
+    unfolded = CompiledForest(compile_model(model, scaler, feature_cols, fold_scaler=False))
+
+    rng = np.random.default_rng(42)
+    n_rows = max(BATCH_SIZES)
+    X = np.column_stack([
+        rng.integers(100, 700, n_rows),
+        rng.integers(0, 60, n_rows),
+        rng.integers(0, 80, n_rows),
+        rng.integers(0, 10, n_rows)
+    ]).astype(np.float64)
+
+    # Rows sitting on every folded threshold and on its float64 neighbours
+    internal = compiled.left != np.arange(len(compiled.left))
+    edges = compiled.threshold[internal]
+    edge_features = compiled.feature[internal]
+    finite = np.isfinite(edges)
+    edges, edge_features = edges[finite], edge_features[finite]
+    edge_rows = np.tile(X[:1], (3 * len(edges), 1))
+    edge_rows[np.arange(3 * len(edges)), np.tile(edge_features, 3)] = np.concatenate(
+        [edges, np.nextafter(edges, -np.inf), np.nextafter(edges, np.inf)]
+    )
+    X_check = np.vstack([X, edge_rows])
+
+    expected = model.predict(scaler.transform(X_check))
+    mismatches = int((expected != unfolded.predict(scaler.transform(X_check))).sum())
+    folded_mismatches = int((expected != compiled.predict(X_check)).sum())
+
+    print("=" * 70)
+    print("🌲 COMPILED FOREST RUNTIME BENCHMARK")
+    print("=" * 70)
+    print(f"\nPrediction mismatches on {len(X_check)} rows: {mismatches} "
+          f"(scaled inputs), {folded_mismatches} (scaler folded, raw inputs)")
+
+    print("\nCold start (import + load + first predict, best of 3):")
+    for name in COLD_START:
+        result = cold_start(name)
+        print(f"  {name:10s}: {result['seconds'] * 1000:8.1f} ms   "
+              f"peak RSS {result['max_rss_mb']:6.1f} MB   "
+              f"sklearn imported: {result['sklearn_imported']}")
+
+    print("\nPer-batch latency (sklearn: scale + predict; compiled: folded predict, median):")
+    print(f"  {'rows':>8s} {'sklearn ms':>12s} {'compiled ms':>12s} {'speedup':>8s}")
+    for batch_size in BATCH_SIZES:
+        batch = X[:batch_size]
+        repeats = 20 if batch_size <= 2000 else 5
+        sklearn_time = batch_latency(lambda b: model.predict(scaler.transform(b)), batch, repeats)
+        compiled_time = batch_latency(lambda b: compiled.predict(b), batch, repeats)
+        print(f"  {batch_size:8d} {sklearn_time * 1000:12.2f} {compiled_time * 1000:12.2f} "
+              f"{sklearn_time / compiled_time:7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
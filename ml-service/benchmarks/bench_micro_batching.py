@@ -0,0 +1,180 @@
+"""
+Benchmark the async micro-batching server against the sync Flask server
+
+Starts each server in a subprocess, then runs closed-loop clients at several
+concurrency levels and reports throughput and latency percentiles for the
+single-food predict endpoint (one model call per request in the sync server)
+and for recommend-foods with a small food list.
+
+Servers:
+    sync   python app.py (threaded Flask/werkzeug server, no batching)
+    async  uvicorn asgi:application (micro-batching)
+
+Usage (from ml-service/):
+    python benchmarks/bench_micro_batching.py [seconds per run]
+"""
+
+import http.client
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+SERVICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+PORT = 5091
+CONCURRENCY = [1, 8, 32, 64]
+
+SERVERS = {
+    'sync': [sys.executable, '-c',
+             f'import app; app.app.run(host="127.0.0.1", port={PORT}, threaded=True)'],
+    'async': [sys.executable, '-m', 'uvicorn', 'asgi:application',
+              '--host', '127.0.0.1', '--port', str(PORT), '--log-level', 'warning']
+}
+
+
+def sample_food(i):
+    return {
+        '_id': str(i),
+        'name': f'Food {i}',
+        'category': 'Lean Protein',
+        'nutritionalInfo': {
+            'calories': 150 + (i * 37) % 500,
+            'protein': (i * 7) % 50,
+            'carbohydrates': (i * 11) % 80
+        }
+    }
+
+
+WORKLOADS = {
+    'predict-food-suitability': (
+        '/api/ml/predict-food-suitability',
+        lambda i: sample_food(i)
+    ),
+    'recommend-foods (20 foods)': (
+        '/api/ml/recommend-foods',
+        lambda i: {
+            'healthProfile': {'conditions': {'diabetes': True, 'hypertension': True}},
+            'foods': [sample_food(i + j) for j in range(20)],
+            'topN': 10
+        }
+    )
+}
+
+
+def start_server(name):
+    env = dict(os.environ, DEBUG='False', PYTHONWARNINGS='ignore')
+    process = subprocess.Popen(SERVERS[name], cwd=SERVICE_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', PORT, timeout=1)
+            connection.request('GET', '/health')
+            if connection.getresponse().status == 200:
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"{name} server did not start")
+
+
+def check_chunked_body(name):
+    """A chunked request (no Content-Length) must reach the handler intact"""
+    body = json.dumps(sample_food(0)).encode('utf-8')
+    connection = http.client.HTTPConnection('127.0.0.1', PORT, timeout=30)
+    connection.request('POST', '/api/ml/predict-food-suitability', iter([body[:20], body[20:]]),
+                       {'Content-Type': 'application/json'}, encode_chunked=True)
+    response = connection.getresponse()
+    response.read()
+    connection.close()
+    if response.status != 200:
+        raise RuntimeError(f"{name} server: chunked request body got HTTP {response.status}")
+
+
+def run_load(path, make_body, concurrency, seconds):
+    """Closed-loop load: each client sends its next request when one returns"""
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + seconds
+
+    def client(worker_id):
+        local = []
+        i = worker_id * 100000
+        while time.perf_counter() < stop_at:
+            body = json.dumps(make_body(i)).encode('utf-8')
+            i += 1
+            start = time.perf_counter()
+            try:
+                connection = http.client.HTTPConnection('127.0.0.1', PORT, timeout=30)
+                connection.request('POST', path, body, {'Content-Type': 'application/json'})
+                response = connection.getresponse()
+                response.read()
+                connection.close()
+                if response.status != 200:
+                    raise RuntimeError(f"HTTP {response.status}")
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+                continue
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        'throughput': len(latencies) / elapsed,
+        'p50': float(np.percentile(latencies_ms, 50)) if len(latencies) else float('nan'),
+        'p95': float(np.percentile(latencies_ms, 95)) if len(latencies) else float('nan'),
+        'p99': float(np.percentile(latencies_ms, 99)) if len(latencies) else float('nan'),
+        'errors': len(errors)
+    }
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    print("=" * 70)
+    print("⚡ MICRO-BATCHING BENCHMARK")
+    print("=" * 70)
+    print(f"\n{seconds:.0f}s per run, CPUs: {os.cpu_count()}")
+
+    results = {}
+    for server in SERVERS:
+        process = start_server(server)
+        try:
+            check_chunked_body(server)
+            for workload, (path, make_body) in WORKLOADS.items():
+                for concurrency in CONCURRENCY:
+                    results[server, workload, concurrency] = run_load(
+                        path, make_body, concurrency, seconds
+                    )
+        finally:
+            process.terminate()
+            process.wait()
+
+    for workload in WORKLOADS:
+        print(f"\n{workload}")
+        print(f"  {'clients':>7s} {'server':7s} {'req/s':>8s} {'p50 ms':>8s} {'p95 ms':>8s} "
+              f"{'p99 ms':>8s} {'errors':>7s}")
+        for concurrency in CONCURRENCY:
+            for server in SERVERS:
+                result = results[server, workload, concurrency]
+                print(f"  {concurrency:7d} {server:7s} {result['throughput']:8.1f} {result['p50']:8.1f} "
+                      f"{result['p95']:8.1f} {result['p99']:8.1f} {result['errors']:7d}")
+
+
+if __name__ == '__main__':
+    main()
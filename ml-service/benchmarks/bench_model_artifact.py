@@ -0,0 +1,109 @@
+"""
+Benchmark the memory-mapped model artifact against the three pickles
+
+Starts several worker processes per loader, like gunicorn workers, and
+reports cold start time and per-worker memory. PSS (proportional set size)
+divides shared pages between the processes that map them, so pages of the
+artifact shared through the page cache show up as lower PSS per worker.
+
+Usage (from ml-service/):
+    python benchmarks/bench_model_artifact.py [workers]
+"""
+
+import multiprocessing
+import os
+import sys
+import time
+
+SERVICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+MODEL_DIR = os.path.join(SERVICE_DIR, 'models')
+sys.path.insert(0, SERVICE_DIR)
+
+SAMPLE = [[250.0, 35.0, 15.0, 6.0]]
+
+
+def load_pickles():
+    import joblib
+    import numpy as np
+    model = joblib.load(os.path.join(MODEL_DIR, 'food_recommendation_model.pkl'))
+    scaler = joblib.load(os.path.join(MODEL_DIR, 'feature_scaler.pkl'))
+    joblib.load(os.path.join(MODEL_DIR, 'feature_columns.pkl'))
+    model.predict(scaler.transform(np.array(SAMPLE)))
+
+
+def load_artifact():
+    import numpy as np
+    from model_artifact import ARTIFACT_FILE, load_model
+    model, header = load_model(os.path.join(MODEL_DIR, ARTIFACT_FILE))
+    model.predict(np.array(SAMPLE))
+
+
+LOADERS = {
+    'pickles': load_pickles,
+    'artifact': load_artifact
+}
+
+
+def memory_kb():
+    """Rss, Pss and private memory of this process from /proc (Linux only)"""
+    fields = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        'rss': fields.get('Rss', 0),
+        'pss': fields.get('Pss', 0),
+        'private': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)
+    }
+
+
+def worker(name, barrier, results):
+    import warnings
+    warnings.filterwarnings('ignore')
+    start = time.perf_counter()
+    LOADERS[name]()
+    elapsed = time.perf_counter() - start
+    # Measure while every worker holds its model
+    barrier.wait()
+    memory = memory_kb()
+    barrier.wait()
+    results.put({'seconds': elapsed, **memory})
+
+
+def run(name, n_workers):
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(n_workers)
+    results = context.Queue()
+    processes = [
+        context.Process(target=worker, args=(name, barrier, results))
+        for _ in range(n_workers)
+    ]
+    for process in processes:
+        process.start()
+    runs = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return {
+        key: sum(run[key] for run in runs) / n_workers
+        for key in ('seconds', 'rss', 'pss', 'private')
+    }
+
+
+def main():
+    n_workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+
+    print("=" * 70)
+    print("📦 MODEL ARTIFACT BENCHMARK")
+    print("=" * 70)
+    print(f"\nWorkers per loader: {n_workers} (averages per worker)")
+    print(f"  {'loader':10s} {'cold start ms':>14s} {'RSS MB':>8s} {'PSS MB':>8s} {'private MB':>11s}")
+    for name in LOADERS:
+        result = run(name, n_workers)
+        print(f"  {name:10s} {result['seconds'] * 1000:14.1f} {result['rss'] / 1024:8.1f} "
+              f"{result['pss'] / 1024:8.1f} {result['private'] / 1024:11.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+"""
+Benchmark per-worker memory of the pre-fork gunicorn server
+
+Starts gunicorn in three configurations, sends the same requests to each,
+then reads the memory of every worker from /proc (Linux only):
+
+    per-worker load   gunicorn app:app, no preload: every worker imports
+                      the app and loads the model itself (before)
+    preload           gunicorn.conf.py with GC_FREEZE=False
+    preload + freeze  gunicorn.conf.py (after): preloaded, warmed, gc.freeze()
+
+RSS counts every page a worker maps, shared or not. PSS divides shared pages
+between the processes that map them, and private memory is what each extra
+worker really costs. The server total is the PSS of the master and all
+workers.
+
+Usage (from ml-service/):
+    python benchmarks/bench_prefork.py [workers] [requests per endpoint]
+"""
+
+import http.client
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+SERVICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+PORT = 5095
+THREADS = 4
+
+
+def sample_food(i):
+    return {
+        '_id': str(i),
+        'name': f'Food {i}',
+        'category': 'Lean Protein',
+        'nutritionalInfo': {
+            'calories': 150 + (i * 37) % 500,
+            'protein': (i * 7) % 50,
+            'carbohydrates': (i * 11) % 80
+        }
+    }
+
+
+FOODS = [sample_food(i) for i in range(60)]
+REQUESTS = [
+    ('/api/ml/predict-food-suitability', FOODS[0]),
+    ('/api/ml/predict-food-suitability/batch', {'foods': FOODS}),
+    ('/api/ml/recommend-foods', {
+        'healthProfile': {'conditions': {'diabetes': True, 'obesity': True}},
+        'foods': FOODS,
+        'topN': 10
+    })
+]
+
+
+def memory_kb(pid):
+    """Rss, Pss and private memory of a process from /proc"""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        'rss': fields.get('Rss', 0),
+        'pss': fields.get('Pss', 0),
+        'private': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)
+    }
+
+
+def worker_pids(master_pid):
+    with open(f'/proc/{master_pid}/task/{master_pid}/children') as f:
+        return [int(pid) for pid in f.read().split()]
+
+
+def start_server(command, env, n_workers):
+    process = subprocess.Popen(command, cwd=SERVICE_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', PORT, timeout=1)
+            connection.request('GET', '/health')
+            if connection.getresponse().status == 200 and len(worker_pids(process.pid)) == n_workers:
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("gunicorn did not start")
+
+
+def send_requests(n_requests, concurrency):
+    """n_requests to every endpoint from concurrent clients, so every worker serves some"""
+    errors = []
+
+    def client(offset):
+        for i in range(offset, n_requests * len(REQUESTS), concurrency):
+            path, body = REQUESTS[i % len(REQUESTS)]
+            connection = http.client.HTTPConnection('127.0.0.1', PORT, timeout=30)
+            connection.request('POST', path, json.dumps(body), {'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            response.read()
+            connection.close()
+            if response.status != 200:
+                errors.append(response.status)
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(errors)
+
+
+def run(command, env, n_workers, n_requests):
+    process = start_server(command, env, n_workers)
+    try:
+        errors = send_requests(n_requests, n_workers * THREADS)
+        workers = [memory_kb(pid) for pid in worker_pids(process.pid)]
+        master = memory_kb(process.pid)
+    finally:
+        process.terminate()
+        process.wait()
+    result = {key: sum(worker[key] for worker in workers) / len(workers) for key in ('rss', 'pss', 'private')}
+    result['total_pss'] = master['pss'] + sum(worker['pss'] for worker in workers)
+    result['errors'] = errors
+    return result
+
+
+def main():
+    n_workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    n_requests = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    print("=" * 70)
+    print("🍴 PRE-FORK SERVER MEMORY BENCHMARK")
+    print("=" * 70)
+    print(f"\n{n_workers} workers x {THREADS} threads, {n_requests} requests per endpoint "
+          f"(averages per worker)")
+
+    env = dict(os.environ, PORT=str(PORT), WEB_CONCURRENCY=str(n_workers), GUNICORN_THREADS=str(THREADS),
+               MODEL_WATCH_INTERVAL='0', PYTHONWARNINGS='ignore')
+    gunicorn = [sys.executable, '-m', 'gunicorn']
+    with tempfile.NamedTemporaryFile('w', suffix='.py') as empty_config:
+        configurations = {
+            'per-worker load': (
+                gunicorn + ['-c', empty_config.name, 'app:app', '--bind', f'127.0.0.1:{PORT}',
+                            '--workers', str(n_workers), '--worker-class', 'gthread',
+                            '--threads', str(THREADS)],
+                env
+            ),
+            'preload': (gunicorn, dict(env, GC_FREEZE='False')),
+            'preload + freeze': (gunicorn, env)
+        }
+
+        print(f"\n  {'server':18s} {'RSS MB':>8s} {'PSS MB':>8s} {'private MB':>11s} "
+              f"{'total PSS MB':>13s} {'errors':>7s}")
+        for name, (command, run_env) in configurations.items():
+            result = run(command, run_env, n_workers, n_requests)
+            print(f"  {name:18s} {result['rss'] / 1024:8.1f} {result['pss'] / 1024:8.1f} "
+                  f"{result['private'] / 1024:11.1f} {result['total_pss'] / 1024:13.1f} "
+                  f"{result['errors']:7d}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,404 @@
+"""
+Load test and latency benchmark of the ML service endpoints
+
+Generates synthetic catalogs (100 to 1M foods) with the category mix and
+nutrition ranges of src/generate_dataset.py, then drives the endpoints and
+reports p50/p95/p99 latency, throughput and peak RSS for each catalog size:
+
+    recommend_foods (inline)    foods sent in every request
+    recommend_foods (catalog)   catalog registered once, referenced by version
+    register_catalog            one registration per size
+    predict_food_suitability    single food, independent of catalog size
+
+Every recommend request asks for a different topN, so the ranking cache never
+answers it. Results are written as JSON (--output) and can be compared with
+an earlier run (--compare) to track changes across commits.
+
+Modes:
+    in-process   Flask test client in this process (default)
+    sync/async   starts `python app.py` / `uvicorn asgi:application` locally and
+                 sends --concurrency closed-loop clients at it; peak RSS is
+                 read from the server process
+
+Usage (from ml-service/):
+    python benchmarks/bench_service_load.py [--sizes 100,1000,...] [--server async]
+                                            [--output results.json] [--compare old.json]
+"""
+
+import argparse
+import contextlib
+import datetime
+import http.client
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+SERVICE_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, SERVICE_DIR)
+sys.path.insert(0, os.path.join(SERVICE_DIR, 'src'))
+
+with contextlib.redirect_stdout(io.StringIO()):
+    # Prints its Colab check on import
+    import generate_dataset  # noqa: E402
+
+CATALOG_SIZES = [100, 1000, 10000, 100000, 1000000]
+CONDITIONS = ['diabetes', 'hypertension', 'heartDisease', 'highCholesterol', 'obesity', 'kidneyDisease']
+PORT = 5093
+# 1M-food catalogs are about 270 MB of JSON, above the service's default limit
+MAX_REQUEST_BYTES = str(1024 ** 3)
+
+SERVERS = {
+    'sync': [sys.executable, '-c',
+             f'import app; app.app.run(host="127.0.0.1", port={PORT}, threaded=True)'],
+    'async': [sys.executable, '-m', 'uvicorn', 'asgi:application',
+              '--host', '127.0.0.1', '--port', str(PORT), '--log-level', 'warning']
+}
+
+
+def synthetic_foods(n_foods, seed=42):
+    """Food dicts shaped like the backend's, drawn like generate_dataset.py"""
+    rng = np.random.default_rng(seed)
+    categories = generate_dataset.categories
+    ranges = generate_dataset.nutrition_ranges
+    category_idx = rng.integers(0, len(categories), n_foods)
+
+    def draw(key):
+        low = np.array([ranges[category][key][0] for category in categories])[category_idx]
+        high = np.array([ranges[category][key][1] for category in categories])[category_idx]
+        return low + (rng.random(n_foods) * (high - low)).astype(np.int64)
+
+    calories, protein, carbohydrates = draw('cal'), draw('pro'), draw('carb')
+    name_idx = rng.integers(0, 1 << 16, n_foods)
+    prices = np.round(rng.uniform(2, 30, n_foods), 2)
+
+    foods = []
+    for i in range(n_foods):
+        category = categories[category_idx[i]]
+        names = generate_dataset.food_items[category]
+        foods.append({
+            '_id': f'{i:024x}',
+            'name': names[name_idx[i] % len(names)],
+            'category': category,
+            'nutritionalInfo': {
+                'calories': int(calories[i]),
+                'protein': int(protein[i]),
+                'carbohydrates': int(carbohydrates[i])
+            },
+            'image': f'food_{i}.png',
+            'price': float(prices[i]),
+            'description': 'A healthy option from the Olive Foods menu'
+        })
+    return foods
+
+
+def condition_sets():
+    """Every non-empty combination of health conditions"""
+    return [
+        {name: bool(mask >> bit & 1) for bit, name in enumerate(CONDITIONS)}
+        for mask in range(1, 1 << len(CONDITIONS))
+    ]
+
+
+def _status_kb(pid, field):
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def peak_rss_mb(pid='self'):
+    """Peak resident set size (VmHWM, Linux only) in MB"""
+    kb = _status_kb(pid, 'VmHWM')
+    return kb / 1024 if kb is not None else None
+
+
+def reset_peak_rss(pid='self'):
+    """Reset VmHWM to the current RSS so each scenario reports its own peak"""
+    try:
+        with open(f'/proc/{pid}/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+class InProcessClient:
+    """Flask test client over the app imported in this process"""
+
+    name = 'in-process'
+
+    def __init__(self):
+        # Keep benchmark catalogs out of the service's catalog directory
+        os.environ.setdefault('CATALOG_DIR', tempfile.mkdtemp(prefix='olive-bench-'))
+        os.environ.setdefault('MODEL_WATCH_INTERVAL', '0')
+        os.environ.setdefault('MAX_REQUEST_BYTES', MAX_REQUEST_BYTES)
+        os.chdir(SERVICE_DIR)
+        import app as service
+        self.service = service
+        self.client = service.app.test_client()
+        # Peak RSS includes the catalogs generated by the benchmark itself
+        self.pid = 'self'
+        self.model_version = service.model_store.active.version
+
+    def post(self, path, body):
+        response = self.client.post(path, data=body, content_type='application/json')
+        return response.status_code, response.get_data()
+
+    def run(self, path, bodies, concurrency):
+        # The test client is synchronous; concurrency does not apply
+        latencies, errors = [], 0
+        started = time.perf_counter()
+        for body in bodies:
+            start = time.perf_counter()
+            status, _ = self.post(path, body)
+            latencies.append(time.perf_counter() - start)
+            errors += status != 200
+        return latencies, errors, time.perf_counter() - started
+
+    def close(self):
+        pass
+
+
+class ServerClient:
+    """Local server in a subprocess, driven by closed-loop client threads"""
+
+    def __init__(self, name):
+        self.name = name
+        env = dict(os.environ, DEBUG='False', PYTHONWARNINGS='ignore', MODEL_WATCH_INTERVAL='0',
+                   MAX_REQUEST_BYTES=MAX_REQUEST_BYTES, CATALOG_DIR=tempfile.mkdtemp(prefix='olive-bench-'))
+        self.process = subprocess.Popen(SERVERS[name], cwd=SERVICE_DIR, env=env,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.pid = self.process.pid
+        deadline = time.time() + 60
+        while time.time() < deadline:
+            try:
+                status, body = self.request('GET', '/health')
+                if status == 200:
+                    self.model_version = json.loads(body).get('model_version')
+                    return
+            except OSError:
+                time.sleep(0.2)
+        self.close()
+        raise RuntimeError(f"{name} server did not start")
+
+    def request(self, method, path, body=None):
+        connection = http.client.HTTPConnection('127.0.0.1', PORT, timeout=600)
+        try:
+            connection.request(method, path, body, {'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            return response.status, response.read()
+        finally:
+            connection.close()
+
+    def post(self, path, body):
+        return self.request('POST', path, body)
+
+    def run(self, path, bodies, concurrency):
+        latencies, errors = [], []
+        lock = threading.Lock()
+        next_body = iter(bodies)
+
+        def client():
+            local, failed = [], 0
+            while True:
+                with lock:
+                    body = next(next_body, None)
+                if body is None:
+                    break
+                start = time.perf_counter()
+                try:
+                    status, _ = self.post(path, body)
+                except OSError:
+                    status = None
+                local.append(time.perf_counter() - start)
+                failed += status != 200
+            with lock:
+                latencies.extend(local)
+                errors.append(failed)
+
+        threads = [threading.Thread(target=client) for _ in range(concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return latencies, sum(errors), time.perf_counter() - started
+
+    def close(self):
+        self.process.terminate()
+        self.process.wait()
+
+
+def summarize(scenario, catalog_size, latencies, errors, elapsed, peak_rss):
+    latencies_ms = np.array(latencies) * 1000
+    throughput = len(latencies) / elapsed if elapsed > 0 else float('nan')
+    return {
+        'scenario': scenario,
+        'catalog_size': catalog_size,
+        'requests': len(latencies),
+        'errors': int(errors),
+        'p50_ms': float(np.percentile(latencies_ms, 50)),
+        'p95_ms': float(np.percentile(latencies_ms, 95)),
+        'p99_ms': float(np.percentile(latencies_ms, 99)),
+        'mean_ms': float(latencies_ms.mean()),
+        'throughput_rps': throughput,
+        'foods_per_second': throughput * catalog_size if catalog_size else None,
+        'peak_rss_mb': peak_rss
+    }
+
+
+def report_row(result):
+    print(f"  {result['scenario']:28s} {result['catalog_size']:>9d} {result['p50_ms']:9.2f} "
+          f"{result['p95_ms']:9.2f} {result['p99_ms']:9.2f} {result['throughput_rps']:9.1f} "
+          f"{result['peak_rss_mb'] or float('nan'):9.1f} {result['errors']:6d}")
+    return result
+
+
+def measure(client, scenario, catalog_size, path, bodies, concurrency):
+    """bodies may be a generator; large request bodies are then built one at a time"""
+    reset_peak_rss(client.pid)
+    latencies, errors, elapsed = client.run(path, bodies, concurrency)
+    return report_row(summarize(scenario, catalog_size, latencies, errors, elapsed,
+                                peak_rss_mb(client.pid)))
+
+
+def requests_for(catalog_size, budget):
+    """Requests per scenario: about budget foods in total, between 5 and 200"""
+    return int(min(200, max(5, budget // catalog_size)))
+
+
+def run(client, sizes, budget, concurrency):
+    conditions = condition_sets()
+    results = []
+
+    print(f"\n  {'scenario':28s} {'foods':>9s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s} "
+          f"{'req/s':>9s} {'peak MB':>9s} {'errors':>6s}")
+
+    bodies = [json.dumps(food).encode('utf-8') for food in synthetic_foods(200, seed=7)]
+    results.append(measure(client, 'predict_food_suitability', 1,
+                           '/api/ml/predict-food-suitability', bodies * 5, concurrency))
+
+    for size in sizes:
+        foods = synthetic_foods(size)
+        n_requests = requests_for(size, budget)
+
+        start = time.perf_counter()
+        reset_peak_rss(client.pid)
+        status, body = client.post('/api/ml/catalog', json.dumps({'foods': foods}).encode('utf-8'))
+        elapsed = time.perf_counter() - start
+        results.append(report_row(summarize('register_catalog', size, [elapsed], status != 200,
+                                            elapsed, peak_rss_mb(client.pid))))
+        version = json.loads(body)['catalogVersion'] if status == 200 else None
+
+        if version is not None:
+            bodies = [
+                json.dumps({'healthProfile': {'conditions': conditions[i % len(conditions)]},
+                            'catalogVersion': version, 'topN': 10 + i}).encode('utf-8')
+                for i in range(n_requests)
+            ]
+            results.append(measure(client, 'recommend_foods (catalog)', size,
+                                   '/api/ml/recommend-foods', bodies, concurrency))
+
+        # The food list is serialized once and spliced into each request
+        foods_json = json.dumps(foods)
+        del foods
+        n_inline = min(n_requests, 20)
+        bodies = (
+            ('{"healthProfile":%s,"topN":%d,"foods":%s}' % (
+                json.dumps({'conditions': conditions[i % len(conditions)]}), 10 + i, foods_json
+            )).encode('utf-8')
+            for i in range(n_inline)
+        )
+        results.append(measure(client, 'recommend_foods (inline)', size,
+                               '/api/ml/recommend-foods', bodies, min(concurrency, n_inline)))
+        del foods_json
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SERVICE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    """Print p50, p99 and throughput relative to an earlier run"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {(r['scenario'], r['catalog_size']): r for r in baseline['results']}
+
+    print(f"\nCompared with {baseline_path} (commit {baseline.get('commit')}):")
+    print(f"  {'scenario':28s} {'foods':>9s} {'p50':>8s} {'p99':>8s} {'req/s':>8s}")
+    for result in results:
+        old = previous.get((result['scenario'], result['catalog_size']))
+        if old is None:
+            continue
+        print(f"  {result['scenario']:28s} {result['catalog_size']:>9d} "
+              f"{result['p50_ms'] / old['p50_ms']:7.2f}x {result['p99_ms'] / old['p99_ms']:7.2f}x "
+              f"{result['throughput_rps'] / old['throughput_rps']:7.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the ML service endpoints')
+    parser.add_argument('--sizes', default=','.join(map(str, CATALOG_SIZES)),
+                        help='comma-separated catalog sizes')
+    parser.add_argument('--server', choices=sorted(SERVERS),
+                        help='start a local server instead of using the test client')
+    parser.add_argument('--concurrency', type=int, default=8,
+                        help='client threads against a server')
+    parser.add_argument('--budget', type=int, default=2000000,
+                        help='foods ranked per scenario; sets the number of requests')
+    parser.add_argument('--output', default='bench_service_load.json', help='JSON results file')
+    parser.add_argument('--compare', help='earlier JSON results to compare against')
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    # The in-process client changes into the service directory
+    output = os.path.abspath(args.output)
+
+    print("=" * 70)
+    print("📈 ML SERVICE LOAD BENCHMARK")
+    print("=" * 70)
+
+    client = ServerClient(args.server) if args.server else InProcessClient()
+    concurrency = args.concurrency if args.server else 1
+    print(f"\nMode: {client.name}, concurrency {concurrency}, CPUs: {os.cpu_count()}, "
+          f"model {client.model_version}")
+    try:
+        results = run(client, sizes, args.budget, concurrency)
+    finally:
+        client.close()
+
+    report = {
+        'benchmark': 'bench_service_load',
+        'commit': git_commit(),
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'mode': client.name,
+        'concurrency': concurrency,
+        'model_version': client.model_version,
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+        'results': results
+    }
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✓ Results written to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
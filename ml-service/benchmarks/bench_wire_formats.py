@@ -0,0 +1,132 @@
+"""
+Benchmark the wire formats of the ML API
+
+Compares serialize and parse cost of catalog-sized payloads in the standard
+json module (Flask's default settings), orjson and MessagePack, and the size
+and cost of gzip and zstd compression of the JSON bytes. Formats whose
+package is not installed are skipped.
+
+Usage (from ml-service/):
+    python benchmarks/bench_wire_formats.py
+"""
+
+import gzip
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+SERVICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, SERVICE_DIR)
+
+from config import Config  # noqa: E402
+from wire import msgpack, orjson, zstandard  # noqa: E402
+
+CATALOG_SIZES = [1000, 10000, 100000]
+
+
+def recommendations(n_foods, seed=42):
+    """A recommend-foods response with n_foods ranked foods"""
+    rng = np.random.default_rng(seed)
+    categories = Config.FOOD_CATEGORIES
+    return {
+        'success': True,
+        'activeConditions': ['diabetes', 'hypertension'],
+        'totalFoods': n_foods,
+        'recommendations': [
+            {
+                'foodId': f'{i:024x}',
+                'name': f'Food item {i}',
+                'category': categories[i % len(categories)],
+                'suitabilityScore': [100.0, 50.0, 0.0][i % 3],
+                'nutritionalInfo': {
+                    'calories': float(rng.integers(50, 700)),
+                    'protein': float(rng.integers(0, 60)),
+                    'carbohydrates': float(rng.integers(0, 90))
+                },
+                'image': f'food_{i}.png',
+                'price': round(float(rng.uniform(2, 30)), 2),
+                'description': 'A healthy option from the Olive Foods menu'
+            }
+            for i in range(n_foods)
+        ]
+    }
+
+
+def codecs():
+    """name -> (encode, decode) for each installed format"""
+    formats = {
+        'json': (
+            lambda obj: json.dumps(obj, sort_keys=True, separators=(',', ':')).encode('utf-8'),
+            json.loads
+        )
+    }
+    if orjson is not None:
+        formats['orjson'] = (
+            lambda obj: orjson.dumps(obj, option=orjson.OPT_SORT_KEYS),
+            orjson.loads
+        )
+    if msgpack is not None:
+        formats['msgpack'] = (
+            lambda obj: msgpack.packb(obj, use_bin_type=True),
+            lambda data: msgpack.unpackb(data, raw=False)
+        )
+    return formats
+
+
+def compressors():
+    """name -> (compress, decompress) for each installed encoding"""
+    encodings = {
+        'gzip': (
+            lambda data: gzip.compress(data, compresslevel=Config.GZIP_LEVEL, mtime=0),
+            gzip.decompress
+        )
+    }
+    if zstandard is not None:
+        encodings['zstd'] = (
+            zstandard.ZstdCompressor(level=Config.ZSTD_LEVEL).compress,
+            lambda data: zstandard.ZstdDecompressor().decompressobj().decompress(data)
+        )
+    return encodings
+
+
+def median_ms(fn, arg, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(arg)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1000
+
+
+def main():
+    print("=" * 70)
+    print("📡 WIRE FORMAT BENCHMARK")
+    print("=" * 70)
+
+    for n_foods in CATALOG_SIZES:
+        payload = recommendations(n_foods)
+        repeats = 10 if n_foods <= 10000 else 3
+        print(f"\nRecommendations: {n_foods}")
+        print(f"  {'format':10s} {'size KB':>10s} {'serialize ms':>13s} {'parse ms':>10s}")
+
+        json_bytes = None
+        for name, (encode, decode) in codecs().items():
+            data = encode(payload)
+            if name == 'json':
+                json_bytes = data
+            assert decode(data) == payload
+            print(f"  {name:10s} {len(data) / 1024:10.1f} {median_ms(encode, payload, repeats):13.2f} "
+                  f"{median_ms(decode, data, repeats):10.2f}")
+
+        for name, (compress, decompress) in compressors().items():
+            data = compress(json_bytes)
+            print(f"  {'json+' + name:10s} {len(data) / 1024:10.1f} "
+                  f"{median_ms(compress, json_bytes, repeats):13.2f} "
+                  f"{median_ms(decompress, data, repeats):10.2f}   (compression only)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+"""
+Columnar food catalog store for the ML service
+
+The backend registers its menu once and then refers to it by a content-hash
+version ID, so recommend requests no longer carry every food. Each catalog is
+kept as typed NumPy column arrays instead of a list of dicts, and is written to
+CATALOG_DIR so every worker process can pick it up. The fields a
+recommendation echoes back (id, name, nutritionalInfo, price, ...) are kept as
+the backend sent them, one UTF-8 JSON array per food in a byte buffer, so a
+catalog recommendation looks exactly like one for foods sent inline.
+
+Model output depends only on a food's features, never on the user, so a
+(foods x conditions) suitability matrix is computed once per catalog and model
+when the catalog is loaded, and cached on the model snapshot (model_store.py).
+Recommending is then a column selection over it.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import featurizer
+from config import Config
+
+# Columns every catalog file must have; older files without them are ignored
+REQUIRED_COLUMNS = ('category_encoded', 'details', 'details_offsets')
+
+
+def _details(food):
+    """Fields a recommendation echoes back, unchanged (see app._food_record)"""
+    return [food.get('_id'), food.get('name'), food.get('category'), food.get('nutritionalInfo', {}),
+            food.get('image'), food.get('price'), food.get('description', '')]
+
+
+class FoodCatalog:
+    """A registered food catalog stored as typed column arrays"""
+
+    def __init__(self, columns, version=None):
+        self.columns = columns
+        self.version = version or self._content_hash(columns)
+
+    def __len__(self):
+        return len(self.columns['category_encoded'])
+
+    @classmethod
+    def from_foods(cls, foods):
+        """Build a catalog from the food dicts sent by the backend"""
+        columns = featurizer.food_columns(foods)
+        details = [json.dumps(_details(food), separators=(',', ':')).encode('utf-8') for food in foods]
+        offsets = np.zeros(len(details) + 1, dtype=np.int64)
+        np.cumsum([len(detail) for detail in details], out=offsets[1:])
+        columns.update({
+            'details': np.frombuffer(b''.join(details), dtype=np.uint8),
+            'details_offsets': offsets
+        })
+        return cls(columns)
+
+    @staticmethod
+    def _content_hash(columns):
+        """Version ID derived from the catalog contents"""
+        digest = hashlib.sha256()
+        for name in sorted(columns):
+            array = np.ascontiguousarray(columns[name])
+            digest.update(name.encode())
+            digest.update(str(array.dtype).encode())
+            digest.update(str(array.shape).encode())
+            digest.update(array.tobytes())
+        return digest.hexdigest()[:16]
+
+    def feature_matrix(self, feature_cols):
+        """Model input matrix for every food, in feature_cols order"""
+        return featurizer.feature_matrix(self.columns, feature_cols)
+
+    def records(self, indices, scores):
+        """Response dicts for the foods at the given indices"""
+        details = self.columns['details']
+        offsets = self.columns['details_offsets']
+        records = []
+        for idx, score in zip(indices, scores):
+            food_id, name, category, nutritional_info, image, price, description = json.loads(
+                details[offsets[idx]:offsets[idx + 1]].tobytes()
+            )
+            records.append({
+                'foodId': food_id,
+                'name': name,
+                'category': category,
+                'suitabilityScore': score,
+                'nutritionalInfo': nutritional_info,
+                'image': image,
+                'price': price,
+                'description': description
+            })
+        return records
+
+    def save(self, path):
+        """Write the catalog atomically as an uncompressed .npz file"""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **self.columns)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, version):
+        """Read a catalog written by save(); None if it lacks a required column"""
+        with np.load(path, allow_pickle=False) as data:
+            columns = {name: data[name] for name in data.files}
+        if not all(name in columns for name in REQUIRED_COLUMNS):
+            return None
+        return cls(columns, version=version)
+
+
+class CatalogStore:
+    """
+    In-process catalog registry backed by a shared directory. Each worker
+    keeps max_catalogs catalogs in memory; evicting one keeps its file,
+    which other workers may still load. The directory keeps the max_files
+    most recently registered or loaded catalogs (file mtime) and older
+    files are deleted when a catalog is registered. A request for a deleted
+    catalog gets a 404 and the backend registers it again.
+    """
+
+    def __init__(self, on_load=None, on_evict=None, catalog_dir=Config.CATALOG_DIR,
+                 max_catalogs=Config.MAX_CATALOGS, max_files=Config.MAX_CATALOG_FILES):
+        # on_load(catalog) runs when a catalog is registered or read from
+        # disk (to precompute suitability); on_evict(version) is called when
+        # a catalog is dropped from memory
+        self.on_load = on_load
+        self.on_evict = on_evict
+        self.catalog_dir = catalog_dir
+        self.max_catalogs = max_catalogs
+        self.max_files = max_files
+        self._catalogs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, version):
+        return os.path.join(self.catalog_dir, f'{version}.npz')
+
+    def _loaded(self, catalog):
+        if self.on_load is not None:
+            self.on_load(catalog)
+
+    def _remember(self, catalog):
+        evicted = []
+        with self._lock:
+            self._catalogs[catalog.version] = catalog
+            self._catalogs.move_to_end(catalog.version)
+            while len(self._catalogs) > self.max_catalogs:
+                evicted.append(self._catalogs.popitem(last=False)[0])
+        if self.on_evict is not None:
+            for version in evicted:
+                self.on_evict(version)
+
+    def _prune_files(self, keep):
+        """Delete the least recently used catalog files beyond max_files"""
+        try:
+            files = [(entry.stat().st_mtime, entry.path) for entry in os.scandir(self.catalog_dir)
+                     if entry.name.endswith('.npz')]
+        except OSError:
+            return
+        files.sort(reverse=True)
+        for _, path in files[self.max_files:]:
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                # Already deleted by another worker
+                pass
+
+    def register(self, foods):
+        """Register (or replace) a catalog and return it"""
+        catalog = FoodCatalog.from_foods(foods)
+        existing = self._catalogs.get(catalog.version)
+        if existing is not None:
+            catalog = existing
+
+        path = self._path(catalog.version)
+        try:
+            if existing is not None and os.path.exists(path):
+                # Most recently used again
+                os.utime(path)
+            else:
+                # Written again if pruned, so other workers find it
+                os.makedirs(self.catalog_dir, exist_ok=True)
+                catalog.save(path)
+            self._prune_files(keep=path)
+        except OSError as e:
+            print(f"⚠ Warning: Could not persist catalog {catalog.version}: {str(e)}")
+        if existing is None:
+            self._loaded(catalog)
+        self._remember(catalog)
+        return catalog
+
+    def get(self, version):
+        """Return a registered catalog, or None if the version is unknown"""
+        catalog = self._catalogs.get(version)
+        if catalog is not None:
+            return catalog
+
+        # Another worker may have registered it
+        if not version or not version.isalnum():
+            return None
+        path = self._path(version)
+        try:
+            catalog = FoodCatalog.load(path, version)
+        except OSError:
+            # Never registered, or deleted as least recently used
+            return None
+        if catalog is None:
+            # Written by an older version; the backend registers it again
+            return None
+        try:
+            # Most recently used, for the file limit
+            os.utime(path)
+        except OSError:
+            pass
+        self._loaded(catalog)
+        self._remember(catalog)
+        return catalog
+
+    def catalogs(self):
+        """Catalogs currently held in memory"""
+        with self._lock:
+            return list(self._catalogs.values())
+
+    def sizes(self):
+        """Number of foods in each catalog held in memory, by version"""
+        with self._lock:
+            return {version: len(catalog) for version, catalog in self._catalogs.items()}
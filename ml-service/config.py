@@ -12,11 +12,56 @@ class Config:
     MODEL_FILE = 'food_recommendation_model.pkl'
     SCALER_FILE = 'feature_scaler.pkl'
     FEATURES_FILE = 'feature_columns.pkl'
+    ARTIFACT_FILE = 'food_recommendation_model.olive'
     
     # API settings
     MAX_RECOMMENDATIONS = 50
     DEFAULT_RECOMMENDATIONS = 10
     
+    # Largest batch accepted by /api/ml/predict-food-suitability/batch
+    MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', 5000))
+    
+    # Recommendations serialized per chunk in streamed (NDJSON) responses
+    STREAM_CHUNK_SIZE = int(os.environ.get('STREAM_CHUNK_SIZE', 1000))
+    
+    # Responses at least this large are compressed (gzip or zstd, per Accept-Encoding)
+    COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 1024))
+    GZIP_LEVEL = 5
+    ZSTD_LEVEL = 3
+    
+    # Largest request body accepted, both as sent and after gzip / zstd
+    # decompression (413 above it)
+    MAX_REQUEST_BYTES = int(os.environ.get('MAX_REQUEST_BYTES', 64 * 1024 * 1024))
+    
+    # Hot model reload: seconds between checks of MODEL_DIR for new model
+    # files (0 disables), and the bearer token of /api/ml/admin/reload-model
+    MODEL_WATCH_INTERVAL = float(os.environ.get('MODEL_WATCH_INTERVAL', 10))
+    MODEL_RELOAD_TOKEN = os.environ.get('MODEL_RELOAD_TOKEN', '')
+    
+    # Request micro-batching (always on in asgi.py): predictions of requests
+    # arriving within the window are run as one model call
+    MICRO_BATCHING = os.environ.get('MICRO_BATCHING', 'False') == 'True'
+    MICRO_BATCH_WINDOW_MS = float(os.environ.get('MICRO_BATCH_WINDOW_MS', 2))
+    MICRO_BATCH_MAX_ROWS = int(os.environ.get('MICRO_BATCH_MAX_ROWS', 512))
+    ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 32))
+    
+    # Pre-fork serving (gunicorn.conf.py): worker processes, threads per
+    # worker, and whether the preloaded heap is frozen before forking
+    WORKERS = int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1))
+    THREADS = int(os.environ.get('GUNICORN_THREADS', 4))
+    GC_FREEZE = os.environ.get('GC_FREEZE', 'True') == 'True'
+    
+    # Registered food catalogs (shared by all workers through CATALOG_DIR)
+    CATALOG_DIR = os.environ.get('CATALOG_DIR', 'catalogs')
+    MAX_CATALOGS = 8
+    # Catalog files kept in CATALOG_DIR; the least recently used are deleted
+    MAX_CATALOG_FILES = int(os.environ.get('MAX_CATALOG_FILES', 32))
+    
+    # Ranked recommendation cache (64 condition sets per catalog and topN)
+    RANKING_CACHE_SIZE = int(os.environ.get('RANKING_CACHE_SIZE', 1024))
+    # Records held across all cached rankings (about 1 KB each)
+    RANKING_CACHE_MAX_RECORDS = int(os.environ.get('RANKING_CACHE_MAX_RECORDS', 50000))
+    
     # Health conditions mapping
     HEALTH_CONDITIONS = [
         'diabetes',
@@ -41,19 +86,8 @@ class Config:
         'Grilled Items'
     ]
     
-    # Category encoding map
-    CATEGORY_ENCODING = {
-        'Salads & Greens': 0,
-        'Low-Carb Meals': 1,
-        'High-Protein': 2,
-        'Heart-Healthy': 3,
-        'Diabetic-Friendly': 4,
-        'Whole Grains': 5,
-        'Lean Protein': 6,
-        'Vegetarian': 7,
-        'Soups': 8,
-        'Grilled Items': 9
-    }
+    # Category encoding map, shared by training and serving (featurizer.py)
+    CATEGORY_ENCODING = {category: code for code, category in enumerate(FOOD_CATEGORIES)}
     
     # Feature columns used in ML model
     FEATURE_COLUMNS = [
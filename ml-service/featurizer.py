@@ -0,0 +1,108 @@
+"""
+Shared featurizer for training and serving
+
+Turns food dicts (API requests, catalogs) or a dataset DataFrame (training)
+into the model's feature matrix. Both sides use the same category encoding,
+Config.CATEGORY_ENCODING, so a model always sees the codes it was trained on.
+
+Categories are encoded in one vectorized pass: names are looked up with
+np.searchsorted in sorted name / code arrays built once at import.
+Unknown or missing categories get the code of DEFAULT_CATEGORY.
+Missing nutrition values count as 0, but a null or non-numeric one raises
+InvalidFoodError: trees send NaN down the right branch of every split, so
+such a food would otherwise get a made-up prediction.
+"""
+
+import numpy as np
+
+from config import Config
+
+FEATURE_COLUMNS = list(Config.FEATURE_COLUMNS)
+CATEGORY_ENCODING = dict(Config.CATEGORY_ENCODING)
+DEFAULT_CATEGORY = 'Grilled Items'
+DEFAULT_CODE = CATEGORY_ENCODING[DEFAULT_CATEGORY]
+
+# Lookup arrays, sorted by category name
+_CATEGORY_NAMES = np.array(sorted(CATEGORY_ENCODING), dtype=np.str_)
+_CATEGORY_CODES = np.array([CATEGORY_ENCODING[name] for name in _CATEGORY_NAMES], dtype=np.int8)
+
+NUTRIENT_COLUMNS = ['calories', 'protein', 'carbohydrates']
+
+
+class InvalidFoodError(ValueError):
+    """A food whose nutrition values cannot be turned into model features"""
+
+
+def _food_label(food, index):
+    label = food.get('name') or food.get('_id')
+    return f"food {index} ({label})" if label else f"food {index}"
+
+
+def encode_categories(categories):
+    """int8 code of every category name"""
+    names = np.asarray(categories, dtype=np.str_)
+    position = np.minimum(np.searchsorted(_CATEGORY_NAMES, names), len(_CATEGORY_NAMES) - 1)
+    known = _CATEGORY_NAMES[position] == names
+    return np.where(known, _CATEGORY_CODES[position], DEFAULT_CODE).astype(np.int8)
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _nutrient_column(foods, nutritional_infos, name):
+    """float64 values of one nutrient; InvalidFoodError names the first bad food"""
+    values = [info.get(name, 0) for info in nutritional_infos]
+    try:
+        column = np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        column = np.array([_to_float(value) for value in values])
+    bad = np.flatnonzero(~np.isfinite(column))
+    if len(bad):
+        index = int(bad[0])
+        raise InvalidFoodError(
+            f"Invalid {_food_label(foods[index], index)}: nutritionalInfo.{name} "
+            f"must be a finite number, got {values[index]!r}"
+        )
+    return column
+
+
+def food_columns(foods):
+    """Typed feature columns for food dicts shaped like the backend's"""
+    nutritional_infos = [food.get('nutritionalInfo') or {} for food in foods]
+    columns = {name: _nutrient_column(foods, nutritional_infos, name) for name in NUTRIENT_COLUMNS}
+    columns['category_encoded'] = encode_categories([food.get('category') or '' for food in foods])
+    return columns
+
+
+def frame_columns(df):
+    """Typed feature columns for a DataFrame with a category name column"""
+    return {
+        'calories': df['calories'].to_numpy(dtype=np.float64),
+        'protein': df['protein'].to_numpy(dtype=np.float64),
+        'carbohydrates': df['carbohydrates'].to_numpy(dtype=np.float64),
+        'category_encoded': encode_categories(df['category'].fillna('').astype(str))
+    }
+
+
+def feature_matrix(columns, feature_cols=FEATURE_COLUMNS):
+    """float64 model input in feature_cols order; absent columns are zero"""
+    n_rows = len(columns['category_encoded'])
+    matrix = np.zeros((n_rows, len(feature_cols)))
+    for idx, col in enumerate(feature_cols):
+        if col in columns:
+            matrix[:, idx] = columns[col]
+    return matrix
+
+
+def features_from_foods(foods, feature_cols=FEATURE_COLUMNS):
+    """Feature matrix for a list of food dicts"""
+    return feature_matrix(food_columns(foods), feature_cols)
+
+
+def features_from_frame(df, feature_cols=FEATURE_COLUMNS):
+    """Feature matrix for a dataset DataFrame"""
+    return feature_matrix(frame_columns(df), feature_cols)
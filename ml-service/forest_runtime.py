@@ -0,0 +1,426 @@
+"""
+Pure-NumPy runtime for the trained tree ensembles
+
+compile_model() flattens the per-condition estimators of the trained
+MultiOutputClassifier (RandomForest, GradientBoosting or DecisionTree) into
+contiguous node arrays: feature, threshold, left, right and value.
+CompiledForest evaluates every tree for a whole batch without walking the
+trees (QuickScorer-style leaf bitmasks, see _leaf_masks()), so serving does
+not need to import scikit-learn.
+
+Predictions match scikit-learn exactly: inputs are rounded to float32 like
+sklearn's tree code does, and tree outputs are accumulated in the same order.
+The arrays are stored on disk by model_artifact.py.
+
+By default compile_model() also folds the StandardScaler into the split
+thresholds (fold_scaler), so the compiled model takes raw features and
+serving skips the scaling pass entirely.
+"""
+
+import numpy as np
+
+FORMAT_VERSION = 1
+
+# How the trees of one condition are combined
+KIND_TREE = 0      # DecisionTree: argmax of the leaf class weights
+KIND_FOREST = 1    # RandomForest: argmax of the mean leaf class probabilities
+KIND_BOOSTING = 2  # binary GradientBoosting: sign of the summed raw scores
+
+# Rows evaluated at once; bounds the (rows x trees x mask words) arrays
+PREDICT_CHUNK_SIZE = 2048
+
+# Leaves per leaf mask word
+MASK_BITS = 64
+
+
+_SIGN_MASK = np.int64(0x7FFFFFFFFFFFFFFF)
+
+
+def _float_keys(values):
+    """Map float64 values to int64 keys with the same ordering"""
+    bits = np.asarray(values, dtype=np.float64).view(np.int64)
+    return np.where(bits < 0, -(bits & _SIGN_MASK) - 1, bits)
+
+
+def _key_floats(keys):
+    """Inverse of _float_keys"""
+    bits = np.where(keys < 0, (-(keys + 1)) | ~_SIGN_MASK, keys)
+    return bits.view(np.float64)
+
+
+def fold_scaler_thresholds(threshold, feature, mean, scale):
+    """
+    Raw-feature thresholds equivalent to scaled ones. sklearn sends a row left
+    when float32((x - mean) / scale) <= threshold. That test is monotone in x,
+    so it holds exactly for x <= the largest float64 passing it, found here by
+    bisecting over the ordered float64 bit patterns (64 steps, all nodes at once).
+    """
+    threshold = np.asarray(threshold, dtype=np.float64)
+    mean = np.asarray(mean, dtype=np.float64)[feature]
+    scale = np.asarray(scale, dtype=np.float64)[feature]
+
+    def goes_left(keys):
+        with np.errstate(over='ignore', invalid='ignore'):
+            scaled = ((_key_floats(keys) - mean) / scale).astype(np.float32)
+        return scaled <= threshold
+
+    max_float = np.finfo(np.float64).max
+    lo = np.full(threshold.shape, _float_keys(-max_float))
+    hi = np.full(threshold.shape, _float_keys(max_float))
+    none_left = ~goes_left(lo)
+    all_left = goes_left(hi)
+
+    # Invariant: lo goes left, hi goes right
+    open_range = ~(none_left | all_left)
+    while True:
+        # Overflow-free midpoint; the key range spans the whole int64 range
+        mid = (lo >> 1) + (hi >> 1) + (lo & hi & 1)
+        active = open_range & (mid != lo)
+        if not active.any():
+            break
+        left = goes_left(mid)
+        lo = np.where(active & left, mid, lo)
+        hi = np.where(active & ~left, mid, hi)
+
+    folded = _key_floats(lo)
+    folded[none_left] = -np.inf
+    folded[all_left] = np.inf
+    return folded
+
+
+class StandardScaling:
+    """StandardScaler.transform without scikit-learn"""
+
+    def __init__(self, mean, scale):
+        self.mean_ = np.asarray(mean, dtype=np.float64)
+        self.scale_ = np.asarray(scale, dtype=np.float64)
+
+    def transform(self, X):
+        X = np.array(X, dtype=np.float64)
+        X -= self.mean_
+        X /= self.scale_
+        return X
+
+
+def _estimator_trees(estimator):
+    """(kind, trees, per-tree value scale, init score) of one fitted estimator"""
+    if hasattr(estimator, 'tree_'):
+        return KIND_TREE, [estimator.tree_], 1.0, 0.0
+
+    if hasattr(estimator, 'learning_rate') and hasattr(estimator, 'init_'):
+        stages = estimator.estimators_
+        if stages.shape[1] != 1:
+            raise ValueError("Only binary GradientBoosting models can be compiled")
+        probe = np.zeros((1, estimator.n_features_in_), dtype=np.float32)
+        init = float(estimator._raw_predict_init(probe)[0, 0])
+        trees = [stage[0].tree_ for stage in stages]
+        return KIND_BOOSTING, trees, float(estimator.learning_rate), init
+
+    if hasattr(estimator, 'estimators_'):
+        return KIND_FOREST, [tree.tree_ for tree in estimator.estimators_], 1.0, 0.0
+
+    raise ValueError(f"Unsupported estimator: {type(estimator).__name__}")
+
+
+def _class_fractions(class_values):
+    """
+    Per-node class fractions. scikit-learn >= 1.4 stores them in tree_.value,
+    older versions store weighted sample counts and normalize in predict_proba.
+    Fractions are kept as stored so the sums match predict_proba bit for bit.
+    """
+    totals = class_values.sum(axis=1, keepdims=True)
+    if np.allclose(totals, 1.0):
+        return class_values
+    totals[totals == 0] = 1.0
+    return class_values / totals
+
+
+def compile_model(model, scaler, feature_cols, fold_scaler=True):
+    """
+    Flatten a fitted MultiOutputClassifier and its scaler into plain arrays.
+    Returns a dict of NumPy arrays that CompiledForest accepts. Node indices
+    are stored as intp so a memory-mapped model is used without copies.
+    With fold_scaler the thresholds are mapped back to raw feature units
+    and the compiled model takes unscaled features.
+    """
+    estimators = model.estimators_
+    max_classes = max(len(est.classes_) for est in estimators)
+
+    feature, threshold, left, right, value = [], [], [], [], []
+    tree_roots = []
+    target_kind, target_tree_start, target_tree_stop = [], [], []
+    target_init, target_n_classes, target_classes = [], [], []
+    n_nodes = 0
+    max_depth = 0
+
+    for estimator in estimators:
+        kind, trees, value_scale, init = _estimator_trees(estimator)
+        target_kind.append(kind)
+        target_tree_start.append(len(tree_roots))
+        target_init.append(init)
+        n_classes = len(estimator.classes_)
+        target_n_classes.append(n_classes)
+        classes = np.zeros(max_classes, dtype=np.int64)
+        classes[:n_classes] = estimator.classes_
+        target_classes.append(classes)
+
+        for tree in trees:
+            node_ids = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+
+            # Leaves point to themselves, which is how CompiledForest finds them
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(np.where(is_leaf, 0.0, tree.threshold))
+            left.append(np.where(is_leaf, node_ids, tree.children_left) + n_nodes)
+            right.append(np.where(is_leaf, node_ids, tree.children_right) + n_nodes)
+
+            node_values = np.zeros((tree.node_count, max_classes))
+            if kind == KIND_BOOSTING:
+                node_values[:, 0] = value_scale * tree.value[:, 0, 0]
+            else:
+                node_values[:, :n_classes] = _class_fractions(tree.value[:, 0, :n_classes])
+            value.append(node_values)
+
+            tree_roots.append(n_nodes)
+            n_nodes += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+
+        target_tree_stop.append(len(tree_roots))
+
+    scaler_mean = np.asarray(scaler.mean_ if scaler.with_mean else np.zeros(len(feature_cols)),
+                             dtype=np.float64)
+    scaler_scale = np.asarray(scaler.scale_ if scaler.with_std else np.ones(len(feature_cols)),
+                              dtype=np.float64)
+    feature = np.concatenate(feature).astype(np.intp)
+    threshold = np.concatenate(threshold).astype(np.float64)
+    if fold_scaler:
+        internal = np.concatenate(left) != np.arange(n_nodes)
+        threshold[internal] = fold_scaler_thresholds(
+            threshold[internal], feature[internal], scaler_mean, scaler_scale
+        )
+
+    return {
+        'format_version': np.array(FORMAT_VERSION),
+        'feature_columns': np.array(feature_cols, dtype=np.str_),
+        'scaler_mean': scaler_mean,
+        'scaler_scale': scaler_scale,
+        # True when the thresholds are in raw feature units
+        'scaler_folded': np.array(fold_scaler),
+        'feature': feature,
+        'threshold': threshold,
+        'left': np.concatenate(left).astype(np.intp),
+        'right': np.concatenate(right).astype(np.intp),
+        'value': np.concatenate(value).astype(np.float64),
+        'tree_roots': np.array(tree_roots, dtype=np.intp),
+        'max_depth': np.array(max_depth),
+        'target_kind': np.array(target_kind, dtype=np.int8),
+        'target_tree_start': np.array(target_tree_start, dtype=np.int32),
+        'target_tree_stop': np.array(target_tree_stop, dtype=np.int32),
+        'target_init': np.array(target_init, dtype=np.float64),
+        'target_n_classes': np.array(target_n_classes, dtype=np.int32),
+        'target_classes': np.array(target_classes, dtype=np.int64)
+    }
+
+
+def _low_bits(count):
+    """int64 words with the lowest count (0..MASK_BITS) bits set"""
+    count = np.asarray(count, dtype=np.int64)
+    return np.where(count >= MASK_BITS, np.int64(-1),
+                    (np.int64(1) << np.minimum(count, MASK_BITS - 1)) - 1)
+
+
+def _leaf_masks(feature, threshold, left, right, tree_roots):
+    """
+    Per-feature lookup tables that give every tree's exit leaf for a row.
+
+    The leaves of a tree are numbered left to right and a row starts with
+    all of them possible, one bit each. A split the row fails (x > threshold)
+    rules out the leaves of its left subtree; the exit leaf is the leftmost
+    leaf that no failed split ruled out, i.e. the lowest bit left set.
+
+    Which splits on a feature fail depends only on how many of that
+    feature's distinct thresholds are below x, so for every feature the
+    AND of the failed splits' masks is precomputed per threshold count:
+    table[count, tree] holds the tree's leaf mask words. Returns
+    ([(feature, thresholds, table)], leaf node of every (tree, bit), words).
+    Only nodes reachable from the roots are used.
+    """
+    left = np.asarray(left, dtype=np.intp)
+    right = np.asarray(right, dtype=np.intp)
+    roots = np.asarray(tree_roots, dtype=np.intp)
+    n_trees = len(roots)
+    node_ids = np.arange(len(left))
+    is_leaf = left == node_ids
+
+    # Internal nodes level by level, top down, and the tree of every node
+    tree_of_node = np.zeros(len(left), dtype=np.intp)
+    tree_of_node[roots] = np.arange(n_trees)
+    levels = []
+    frontier = roots[~is_leaf[roots]]
+    while len(frontier):
+        levels.append(frontier)
+        tree_of_node[left[frontier]] = tree_of_node[frontier]
+        tree_of_node[right[frontier]] = tree_of_node[frontier]
+        children = np.concatenate([left[frontier], right[frontier]])
+        frontier = children[~is_leaf[children]]
+
+    # Leaves under every node (bottom up), then the bit of each subtree's first leaf
+    n_leaves = is_leaf.astype(np.int64)
+    for nodes in reversed(levels):
+        n_leaves[nodes] = n_leaves[left[nodes]] + n_leaves[right[nodes]]
+    first_leaf = np.zeros(len(left), dtype=np.int64)
+    for nodes in levels:
+        first_leaf[left[nodes]] = first_leaf[nodes]
+        first_leaf[right[nodes]] = first_leaf[nodes] + n_leaves[left[nodes]]
+    n_words = max(1, -(-int(n_leaves[roots].max(initial=1)) // MASK_BITS))
+
+    reached = np.zeros(len(left), dtype=bool)
+    reached[roots] = True
+    for nodes in levels:
+        reached[left[nodes]] = True
+        reached[right[nodes]] = True
+    leaves = node_ids[reached & is_leaf]
+    leaf_nodes = np.zeros((n_trees, MASK_BITS * n_words), dtype=np.intp)
+    leaf_nodes[tree_of_node[leaves], first_leaf[leaves]] = leaves
+
+    # Mask of each split: every bit except those of its left subtree
+    splits = np.concatenate(levels) if levels else node_ids[:0]
+    word_start = np.arange(n_words) * MASK_BITS
+    start = np.clip(first_leaf[splits, np.newaxis] - word_start, 0, MASK_BITS)
+    stop = np.clip(first_leaf[splits, np.newaxis] + n_leaves[left[splits], np.newaxis] - word_start,
+                   0, MASK_BITS)
+    split_masks = ~(_low_bits(stop) & ~_low_bits(start))
+
+    split_feature = np.asarray(feature)[splits]
+    split_threshold = np.asarray(threshold, dtype=np.float64)[splits]
+    tables = []
+    for column in np.unique(split_feature):
+        on_column = split_feature == column
+        thresholds = np.unique(split_threshold[on_column])
+        table = np.full((len(thresholds) + 1, n_trees, n_words), -1, dtype=np.int64)
+        # A split fails for rows whose count of lower thresholds exceeds its own index
+        np.bitwise_and.at(
+            table,
+            (np.searchsorted(thresholds, split_threshold[on_column]) + 1,
+             tree_of_node[splits[on_column]]),
+            split_masks[on_column]
+        )
+        np.bitwise_and.accumulate(table, axis=0, out=table)
+        tables.append((int(column), thresholds, table))
+    return tables, leaf_nodes.ravel(), n_words
+
+
+class CompiledForest:
+    """Batched evaluator for the arrays produced by compile_model()"""
+
+    def __init__(self, arrays):
+        if int(arrays['format_version']) != FORMAT_VERSION:
+            raise ValueError(f"Unsupported compiled model format: {int(arrays['format_version'])}")
+
+        self.feature_cols = [str(col) for col in arrays['feature_columns']]
+        # None when the scaler is folded into the thresholds: predict() then
+        # takes raw features and the scaling pass is skipped
+        self.scaler_folded = 'scaler_folded' in arrays and bool(arrays['scaler_folded'])
+        self.scaler = None if self.scaler_folded else StandardScaling(
+            arrays['scaler_mean'], arrays['scaler_scale']
+        )
+
+        # Node arrays are used with their stored dtypes (intp / float64, or the
+        # narrower ones of model_compaction.py), so memory-mapped arrays are
+        # never copied
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.value = arrays['value']
+        self.tree_roots = arrays['tree_roots']
+
+        self.target_kind = arrays['target_kind']
+        self.target_tree_start = arrays['target_tree_start']
+        self.target_tree_stop = arrays['target_tree_stop']
+        self.target_init = arrays['target_init']
+        self.target_n_classes = arrays['target_n_classes']
+        self.target_classes = arrays['target_classes']
+
+        # Built once per load (a few MB); the pre-fork master builds them before forking
+        self.mask_tables, self.leaf_nodes, self.mask_words = _leaf_masks(
+            self.feature, self.threshold, self.left, self.right, self.tree_roots
+        )
+        n_trees = len(self.tree_roots)
+        self._tree_bit_offsets = np.arange(n_trees) * (MASK_BITS * self.mask_words)
+        self.chunk_size = max(1, PREDICT_CHUNK_SIZE // self.mask_words)
+
+    def _leaf_values(self, X):
+        """(trees x rows x classes) leaf values reached by every row"""
+        n_rows = X.shape[0]
+        mask = None
+        for column, thresholds, table in self.mask_tables:
+            # Rows x trees x words: leaves still possible after this feature's splits
+            column_mask = table[np.searchsorted(thresholds, X[:, column])]
+            if mask is None:
+                mask = column_mask
+            else:
+                mask &= column_mask
+        if mask is None:
+            mask = np.full((n_rows, len(self.tree_roots), self.mask_words), -1, dtype=np.int64)
+
+        if self.mask_words == 1:
+            word = 0
+            mask = mask[:, :, 0]
+        else:
+            word = np.argmax(mask != 0, axis=2)
+            mask = np.take_along_axis(mask, word[:, :, np.newaxis], axis=2)[:, :, 0]
+        # Index of the lowest set bit; the exponent of a power of two is exact
+        bit = np.frexp(mask & -mask)[1] - 1 + MASK_BITS * word
+        nodes = self.leaf_nodes[bit + self._tree_bit_offsets]
+        return np.take(self.value, nodes.T, axis=0)
+
+    def _predict_chunk(self, X):
+        leaf_values = self._leaf_values(X)
+        n_rows = X.shape[0]
+        predictions = np.empty((n_rows, len(self.target_kind)), dtype=np.int64)
+
+        for target, kind in enumerate(self.target_kind):
+            start = self.target_tree_start[target]
+            stop = self.target_tree_stop[target]
+            n_classes = self.target_n_classes[target]
+            classes = self.target_classes[target]
+
+            if kind == KIND_BOOSTING:
+                raw = np.full(n_rows, self.target_init[target])
+                for tree in range(start, stop):
+                    raw += leaf_values[tree, :, 0]
+                # Same decision rule as GradientBoostingClassifier.predict
+                predictions[:, target] = classes[(raw >= 0).astype(np.intp)]
+                continue
+
+            if kind == KIND_FOREST:
+                proba = np.zeros((n_rows, n_classes))
+                for tree in range(start, stop):
+                    proba += leaf_values[tree, :, :n_classes]
+                proba /= stop - start
+            else:
+                proba = leaf_values[start, :, :n_classes]
+            predictions[:, target] = classes[np.argmax(proba, axis=1)]
+
+        return predictions
+
+    def predict(self, X):
+        """
+        Predict every condition like model.predict. Takes raw feature rows
+        when the scaler is folded, scaled rows otherwise.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if not np.isfinite(X).all():
+            # NaN fails every split test and would silently go right; sklearn rejects it too
+            raise ValueError("Input contains NaN or infinity")
+        if not self.scaler_folded:
+            # sklearn evaluates trees on float32 inputs
+            X = X.astype(np.float32)
+        if X.shape[0] <= self.chunk_size:
+            return self._predict_chunk(X)
+        return np.concatenate([
+            self._predict_chunk(X[start:start + self.chunk_size])
+            for start in range(0, X.shape[0], self.chunk_size)
+        ])
+
@@ -0,0 +1,47 @@
+"""
+gunicorn settings for the pre-fork production server
+
+Usage (from ml-service/, where gunicorn picks up this file):
+    gunicorn wsgi:application
+    WEB_CONCURRENCY=8 GUNICORN_THREADS=4 PORT=5001 gunicorn wsgi:application
+
+The app is preloaded: the master imports wsgi.py once, which loads and warms
+the model, and the workers are forked from it. Pages of the master are
+shared with every worker until one of them writes to the page. To keep
+them shared:
+
+- the garbage collector is off while the app is preloaded, so collections
+  do not free objects in the middle of the heap, leaving holes that later
+  allocations would fill.
+- gc.freeze() then moves every object alive in the master to a permanent
+  generation that collections skip. A collection in a worker otherwise
+  writes to every tracked object it scans and copies the page it sits on.
+- the model arrays are memory-mapped from the artifact file
+  (model_artifact.py), so they are shared through the page cache anyway.
+
+GC_FREEZE=False keeps the default GC behaviour (for comparisons, see
+benchmarks/bench_prefork.py).
+"""
+
+import gc
+
+from config import Config
+
+wsgi_app = 'wsgi:application'
+bind = f'0.0.0.0:{Config.PORT}'
+workers = Config.WORKERS
+# Flask handlers are synchronous; each worker serves THREADS requests at once
+worker_class = 'gthread'
+threads = Config.THREADS
+preload_app = True
+
+if Config.GC_FREEZE:
+    gc.disable()
+
+
+def when_ready(server):
+    """Runs in the master after the app is preloaded, before the first fork"""
+    if Config.GC_FREEZE:
+        gc.freeze()
+        gc.enable()
+        server.log.info("GC heap frozen: %d objects shared with the workers", gc.get_freeze_count())
@@ -0,0 +1,235 @@
+"""
+Lightweight Prometheus metrics for the ML service
+
+Counters, gauges and histograms rendered in the Prometheus text exposition
+format (version 0.0.4), without the prometheus_client dependency. Recording a
+sample is a dict lookup, a bisect and a few additions under a lock, so the
+instrumentation can stay on in production.
+
+StageTimer splits one request into stages (parse, featurize, scale, predict,
+rank, serialize) and records each into STAGE_SECONDS.
+"""
+
+import bisect
+import math
+import threading
+import time
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds; spans sub-millisecond cache hits up to the backend's 10s timeout
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Foods per request or batch
+SIZE_BUCKETS = (1, 10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000, 1000000)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value)) if abs(value) < 1e15 else repr(value)
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Registry:
+    """Ordered collection of metrics rendered by /metrics"""
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def reset(self):
+        """Forget every recorded sample (callback metrics are read at scrape time)"""
+        with self._lock:
+            metrics = list(self._metrics)
+        for metric in metrics:
+            metric.reset()
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    """
+    Base for labelled metrics. With callback, values are read at scrape time
+    instead: callback() returns a number, or a {label values tuple: number}
+    dict for labelled metrics.
+    """
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY, callback=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+        self._values = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _collect(self):
+        if self.callback is None:
+            with self._lock:
+                return sorted(self._values.items())
+        values = self.callback()
+        if not isinstance(values, dict):
+            values = {(): values}
+        return sorted((tuple(str(v) for v in key), value) for key, value in values.items())
+
+    def _header(self):
+        return [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.kind}'
+        ]
+
+    def render(self):
+        lines = self._header()
+        for key, value in self._collect():
+            lines.append(f'{self.name}{_labels(self.labelnames, key)} {_format_value(value)}')
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Current value that can go up and down"""
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram with _bucket, _sum and _count series"""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY,
+                 buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        # Non-cumulative counts; the last slot is the +Inf bucket
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][slot] += 1
+            state[1] += value
+
+    def render(self):
+        with self._lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = self._header()
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, key)} {_format_value(total)}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, key)} {cumulative}')
+        return lines
+
+
+REQUESTS = Counter(
+    'ml_requests_total', 'HTTP requests handled, by endpoint and status code',
+    ('endpoint', 'status')
+)
+REQUEST_SECONDS = Histogram(
+    'ml_request_duration_seconds', 'End-to-end request latency in the service',
+    ('endpoint',)
+)
+STAGE_SECONDS = Histogram(
+    'ml_stage_duration_seconds',
+    'Latency of each request stage (parse, featurize, scale, predict, rank, serialize)',
+    ('endpoint', 'stage')
+)
+CATALOG_FOODS = Histogram(
+    'ml_catalog_size_foods', 'Foods in the catalog ranked by a recommendation request',
+    ('endpoint',), buckets=SIZE_BUCKETS
+)
+BATCH_FOODS = Histogram(
+    'ml_batch_size_foods', 'Foods scored per prediction batch',
+    ('endpoint',), buckets=SIZE_BUCKETS
+)
+
+
+class StageTimer:
+    """
+    Records consecutive stages of one request:
+
+        timer = StageTimer('recommend_foods', start=g.request_start)
+        data = request.json
+        timer.mark('parse')
+
+    The first stage runs from start (default: now), so starting at the
+    request start puts the body decoding of the before_request hooks in it.
+    """
+
+    __slots__ = ('endpoint', '_last')
+
+    def __init__(self, endpoint, start=None):
+        self.endpoint = endpoint
+        self._last = time.perf_counter() if start is None else start
+
+    def mark(self, stage):
+        """Record the time since the previous mark as stage"""
+        now = time.perf_counter()
+        STAGE_SECONDS.observe(now - self._last, endpoint=self.endpoint, stage=stage)
+        self._last = now
+
+    def skip(self):
+        """Restart the clock without recording"""
+        self._last = time.perf_counter()
+
+
+def render():
+    return REGISTRY.render()
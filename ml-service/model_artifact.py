@@ -0,0 +1,154 @@
+"""
+Single-file, versioned model artifact for serving
+
+One file holds everything the service needs: the compiled forest node arrays,
+the scaler parameters, the feature columns, training metadata and a SHA-256
+checksum of the array payload. Arrays are stored raw and 64-byte aligned after
+a JSON header, so load_artifact() maps them straight from the file: every
+worker process shares the same pages through the OS page cache instead of
+holding a private unpickled copy.
+
+File layout:
+    b'OLIVEMDL' | header length (uint64, little endian) | JSON header | arrays
+
+Usage (convert the pickles in a model directory):
+    python model_artifact.py models
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import struct
+import sys
+
+import numpy as np
+
+from forest_runtime import CompiledForest
+
+MAGIC = b'OLIVEMDL'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+ARTIFACT_FILE = 'food_recommendation_model.olive'
+
+
+def _aligned(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def save_artifact(path, arrays, metadata=None):
+    """
+    Write compiled model arrays and metadata as one artifact file.
+    The file is written next to path and renamed into place, so readers
+    never see a partial artifact. Returns the header.
+    """
+    arrays = {name: np.asarray(array, order='C') for name, array in arrays.items()}
+
+    # Array offsets are relative to the start of the data section
+    index = {}
+    digest = hashlib.sha256()
+    offset = 0
+    for name, array in arrays.items():
+        offset = _aligned(offset)
+        index[name] = {
+            'dtype': array.dtype.str,
+            'shape': list(array.shape),
+            'offset': offset,
+            'nbytes': array.nbytes
+        }
+        digest.update(array.tobytes())
+        offset += array.nbytes
+
+    checksum = digest.hexdigest()
+    header = {
+        'format_version': FORMAT_VERSION,
+        'model_version': checksum[:12],
+        'checksum': {'algorithm': 'sha256', 'value': checksum},
+        'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'metadata': metadata or {},
+        'arrays': index
+    }
+    header_bytes = json.dumps(header).encode('utf-8')
+    data_start = _aligned(len(MAGIC) + 8 + len(header_bytes))
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(header_bytes)))
+        f.write(header_bytes)
+        for name, array in arrays.items():
+            f.seek(data_start + index[name]['offset'])
+            f.write(array.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+    return header
+
+
+def read_header(path):
+    """Header dict and the file offset where array data starts"""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"Not a model artifact: {path}")
+        (header_length,) = struct.unpack('<Q', f.read(8))
+        header = json.loads(f.read(header_length).decode('utf-8'))
+    if header.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format: {header.get('format_version')}")
+    return header, _aligned(len(MAGIC) + 8 + header_length)
+
+
+def load_artifact(path, verify=True):
+    """
+    Map an artifact into memory. Returns (header, arrays) where the arrays
+    are read-only views of the file. With verify=True the payload checksum
+    is checked first.
+    """
+    header, data_start = read_header(path)
+    # Plain ndarray view of the mapping (memmap subclasses mishandle 0-d views)
+    mapped = np.asarray(np.memmap(path, dtype=np.uint8, mode='r'))
+
+    arrays = {}
+    digest = hashlib.sha256()
+    for name, entry in header['arrays'].items():
+        start = data_start + entry['offset']
+        raw = mapped[start:start + entry['nbytes']]
+        if verify:
+            digest.update(raw)
+        arrays[name] = raw.view(np.dtype(entry['dtype'])).reshape(tuple(entry['shape']))
+
+    if verify and digest.hexdigest() != header['checksum']['value']:
+        raise ValueError(f"Checksum mismatch in model artifact: {path}")
+    return header, arrays
+
+
+def load_model(path, verify=True):
+    """CompiledForest backed by a memory-mapped artifact, plus its header"""
+    header, arrays = load_artifact(path, verify=verify)
+    return CompiledForest(arrays), header
+
+
+def main():
+    """Build an artifact from the pickled model in a model directory"""
+    import joblib
+    import sklearn
+    from forest_runtime import compile_model
+
+    model_dir = sys.argv[1] if len(sys.argv) > 1 else 'models'
+    model = joblib.load(os.path.join(model_dir, 'food_recommendation_model.pkl'))
+    scaler = joblib.load(os.path.join(model_dir, 'feature_scaler.pkl'))
+    feature_cols = joblib.load(os.path.join(model_dir, 'feature_columns.pkl'))
+
+    output_path = os.path.join(model_dir, ARTIFACT_FILE)
+    header = save_artifact(
+        output_path,
+        compile_model(model, scaler, feature_cols),
+        metadata={
+            'model_type': type(model.estimators_[0]).__name__,
+            'sklearn_version': sklearn.__version__,
+            'source': 'food_recommendation_model.pkl'
+        }
+    )
+    print(f"✓ Model artifact saved: {output_path} (version {header['model_version']})")
+
+
+if __name__ == '__main__':
+    main()
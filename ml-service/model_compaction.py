@@ -0,0 +1,240 @@
+"""
+Compact, quantized compiled models for low-memory serving
+
+compact_model() shrinks the arrays made by forest_runtime.compile_model():
+
+1. Prune: subtrees whose leaves all give the same output collapse into one
+   leaf (same leaf values for forests and boosting, same class for a single
+   decision tree), and the unreachable nodes are dropped. Lossless.
+2. Narrow dtypes: node indices are stored as int32 (int16 when they fit),
+   feature indices as int8, thresholds as float32 rounded down and leaf
+   values as float32. A threshold rounded down to float32 routes every
+   float32-representable input (all whole numbers below 2**24, like the
+   nutrition values) exactly as before. Summing float32 leaf values can
+   flip near-ties, which the accuracy check below measures.
+3. Tree subset (optional, needs validation data held out of training):
+   each forest or boosting condition keeps only its first k trees, the
+   fewest whose validation accuracy is within max_accuracy_loss of the
+   exact model on that condition. The exact-match accuracy over all
+   conditions must also stay within max_accuracy_loss; while it does not,
+   the condition that helps it most gets trees back.
+
+CompiledForest evaluates the compact arrays as stored, so a memory-mapped
+compact artifact is still used without copies.
+"""
+
+import numpy as np
+
+from forest_runtime import KIND_BOOSTING, KIND_FOREST, KIND_TREE, CompiledForest
+
+# Largest per-condition accuracy drop accepted for the tree subset
+MAX_ACCURACY_LOSS = 0.005
+
+
+def _node_kinds(arrays):
+    """Target kind of every node"""
+    n_nodes = len(arrays['left'])
+    tree_of_node = np.searchsorted(arrays['tree_roots'], np.arange(n_nodes), side='right') - 1
+    tree_kind = np.repeat(arrays['target_kind'],
+                          np.asarray(arrays['target_tree_stop']) - np.asarray(arrays['target_tree_start']))
+    return tree_kind[tree_of_node]
+
+
+def collapse_redundant(arrays):
+    """Turn internal nodes whose two children are equivalent leaves into leaves, bottom up"""
+    arrays = dict(arrays)
+    feature = np.array(arrays['feature'])
+    threshold = np.array(arrays['threshold'])
+    left = np.array(arrays['left'])
+    right = np.array(arrays['right'])
+    value = np.array(arrays['value'])
+    node_ids = np.arange(len(left))
+    by_class = _node_kinds(arrays) == KIND_TREE
+
+    # Every pass collapses one more level of the deepest redundant subtrees
+    while True:
+        is_leaf = left == node_ids
+        candidates = ~is_leaf & is_leaf[left] & is_leaf[right]
+        same_value = (value[left] == value[right]).all(axis=1)
+        same_class = np.argmax(value[left], axis=1) == np.argmax(value[right], axis=1)
+        collapse = candidates & np.where(by_class, same_class, same_value)
+        if not collapse.any():
+            break
+        value[collapse] = value[left[collapse]]
+        left[collapse] = node_ids[collapse]
+        right[collapse] = node_ids[collapse]
+        feature[collapse] = 0
+        threshold[collapse] = 0.0
+
+    arrays.update(feature=feature, threshold=threshold, left=left, right=right, value=value)
+    return arrays
+
+
+def keep_trees(arrays, n_trees):
+    """
+    Keep the first n_trees[target] trees of every condition and only the
+    nodes reachable from their roots, renumbered in their original order
+    """
+    starts = np.asarray(arrays['target_tree_start'])
+    roots = np.concatenate([
+        arrays['tree_roots'][start:start + count] for start, count in zip(starts, n_trees)
+    ]).astype(np.intp)
+    left = np.asarray(arrays['left'])
+    right = np.asarray(arrays['right'])
+
+    reachable = np.zeros(len(left), dtype=bool)
+    frontier = roots
+    max_depth = 0
+    while True:
+        reachable[frontier] = True
+        internal = frontier[left[frontier] != frontier]
+        if not len(internal):
+            break
+        frontier = np.concatenate([left[internal], right[internal]])
+        max_depth += 1
+
+    new_index = np.cumsum(reachable) - 1
+    arrays = dict(arrays)
+    for name in ('feature', 'threshold', 'value'):
+        arrays[name] = np.asarray(arrays[name])[reachable]
+    arrays['left'] = new_index[left[reachable]]
+    arrays['right'] = new_index[right[reachable]]
+    arrays['tree_roots'] = new_index[roots]
+    arrays['max_depth'] = np.array(max_depth)
+    stops = np.cumsum(n_trees)
+    arrays['target_tree_start'] = (stops - np.asarray(n_trees)).astype(np.int32)
+    arrays['target_tree_stop'] = stops.astype(np.int32)
+    return arrays
+
+
+def _round_down_float32(values):
+    """Largest float32 <= each value"""
+    rounded = np.asarray(values, dtype=np.float64).astype(np.float32)
+    above = rounded.astype(np.float64) > values
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded
+
+
+def narrow_dtypes(arrays):
+    """Smallest node array dtypes, float32 thresholds and leaf values"""
+    arrays = dict(arrays)
+    n_nodes = len(arrays['left'])
+    index_dtype = np.int16 if n_nodes <= np.iinfo(np.int16).max else np.int32
+    n_features = len(arrays['feature_columns'])
+    feature_dtype = np.int8 if n_features <= np.iinfo(np.int8).max else np.int16
+
+    arrays['feature'] = np.asarray(arrays['feature']).astype(feature_dtype)
+    arrays['left'] = np.asarray(arrays['left']).astype(index_dtype)
+    arrays['right'] = np.asarray(arrays['right']).astype(index_dtype)
+    arrays['tree_roots'] = np.asarray(arrays['tree_roots']).astype(index_dtype)
+    arrays['threshold'] = _round_down_float32(arrays['threshold'])
+    arrays['value'] = np.asarray(arrays['value']).astype(np.float32)
+    return arrays
+
+
+def _tree_outputs(forest, X):
+    """(trees x rows x classes) leaf values, prepared like CompiledForest.predict"""
+    X = np.asarray(X, dtype=np.float64)
+    if not forest.scaler_folded:
+        X = X.astype(np.float32)
+    return forest._leaf_values(X)
+
+
+def prefix_predictions(arrays, X):
+    """
+    Per condition, (trees x rows) predictions of the first k trees for
+    every k (index k - 1), in one traversal of all trees
+    """
+    forest = CompiledForest(arrays)
+    leaf_values = _tree_outputs(forest, X)
+    predictions_per_target = []
+    for target, kind in enumerate(forest.target_kind):
+        start = forest.target_tree_start[target]
+        stop = forest.target_tree_stop[target]
+        n_classes = forest.target_n_classes[target]
+        classes = forest.target_classes[target]
+
+        if kind == KIND_BOOSTING:
+            # Summed in the same order as CompiledForest, starting from the init score
+            init = np.full((1, X.shape[0]), forest.target_init[target])
+            raw = np.cumsum(np.concatenate([init, leaf_values[start:stop, :, 0]]), axis=0)[1:]
+            predictions = classes[(raw >= 0).astype(np.intp)]
+        elif kind == KIND_FOREST:
+            proba = np.cumsum(leaf_values[start:stop, :, :n_classes], axis=0, dtype=np.float64)
+            proba /= np.arange(1, stop - start + 1)[:, np.newaxis, np.newaxis]
+            predictions = classes[np.argmax(proba, axis=2)]
+        else:
+            predictions = classes[np.argmax(leaf_values[start:stop, :, :n_classes], axis=2)]
+        predictions_per_target.append(predictions)
+    return predictions_per_target
+
+
+def prefix_correct(arrays, X, y):
+    """Per condition, (trees x rows) correctness of the first k trees"""
+    y = np.asarray(y)
+    return [predictions == y[:, target]
+            for target, predictions in enumerate(prefix_predictions(arrays, X))]
+
+
+def exact_match_accuracy(correct, n_trees):
+    """Share of rows with every condition right when condition t keeps n_trees[t] trees"""
+    return float(np.logical_and.reduce([c[k - 1] for c, k in zip(correct, n_trees)]).mean())
+
+
+def choose_tree_counts(exact_correct, compact_correct, max_accuracy_loss):
+    """
+    Fewest trees per condition within max_accuracy_loss of the exact model,
+    per condition and in exact-match accuracy over all conditions
+    """
+    trees_before = [len(correct) for correct in compact_correct]
+    n_trees = list(trees_before)
+    for target, (exact, compact) in enumerate(zip(exact_correct, compact_correct)):
+        within = np.flatnonzero(compact.mean(axis=1) >= exact[-1].mean() - max_accuracy_loss)
+        if len(within):
+            n_trees[target] = int(within[0]) + 1
+
+    floor = exact_match_accuracy(exact_correct, [len(c) for c in exact_correct]) - max_accuracy_loss
+    while exact_match_accuracy(compact_correct, n_trees) < floor:
+        reduced = [target for target in range(len(n_trees)) if n_trees[target] < trees_before[target]]
+        if not reduced:
+            break
+        # The condition whose full tree count gains the most, then its fewest trees meeting the floor
+        target = max(reduced, key=lambda t: exact_match_accuracy(
+            compact_correct, n_trees[:t] + [trees_before[t]] + n_trees[t + 1:]))
+        for k in range(n_trees[target] + 1, trees_before[target] + 1):
+            n_trees[target] = k
+            if exact_match_accuracy(compact_correct, n_trees) >= floor:
+                break
+    return n_trees
+
+
+def compact_model(arrays, X_val=None, y_val=None, max_accuracy_loss=MAX_ACCURACY_LOSS):
+    """
+    Compact compiled model arrays (see the module docstring). Without
+    validation data no trees are removed; it must not be the data the
+    compact model is evaluated on. Returns (arrays, summary).
+    """
+    trees_before = (np.asarray(arrays['target_tree_stop']) - np.asarray(arrays['target_tree_start'])).tolist()
+    compact = collapse_redundant(arrays)
+    compact = keep_trees(compact, trees_before)
+    pruned_nodes = len(compact['left'])
+    compact = narrow_dtypes(compact)
+
+    n_trees = list(trees_before)
+    if X_val is not None and max_accuracy_loss is not None:
+        n_trees = choose_tree_counts(prefix_correct(arrays, X_val, y_val),
+                                     prefix_correct(compact, X_val, y_val), max_accuracy_loss)
+        compact = narrow_dtypes(keep_trees(compact, n_trees))
+
+    summary = {
+        'nodes_before': int(len(arrays['left'])),
+        'nodes_after_pruning': int(pruned_nodes),
+        'nodes_after': int(len(compact['left'])),
+        'trees_before': trees_before,
+        'trees_after': n_trees,
+        'max_accuracy_loss': max_accuracy_loss if X_val is not None else None,
+        'validation_rows': int(len(X_val)) if X_val is not None else 0,
+        'bytes_before': int(sum(np.asarray(array).nbytes for array in arrays.values())),
+        'bytes_after': int(sum(np.asarray(array).nbytes for array in compact.values()))
+    }
+    return compact, summary
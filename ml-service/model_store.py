@@ -0,0 +1,188 @@
+"""
+Loaded model snapshots and hot reloading
+
+A LoadedModel bundles everything a request needs from one model: the
+predictor, scaler, feature columns, version and the per-catalog suitability
+matrices computed with it. Requests take the active snapshot once and use
+only that, so a reload can never mix parts of two models.
+
+ModelStore.reload() loads the new files and warms them in a background
+thread. The new snapshot replaces the active one with a single reference
+assignment. Reloads are triggered by polling the model directory
+(start_watching) or through the authenticated reload endpoint in app.py.
+"""
+
+import datetime
+import hashlib
+import os
+import threading
+import time
+
+import joblib
+
+from featurizer import CATEGORY_ENCODING
+from model_artifact import ARTIFACT_FILE, load_model
+
+MODEL_FILE = 'food_recommendation_model.pkl'
+SCALER_FILE = 'feature_scaler.pkl'
+FEATURES_FILE = 'feature_columns.pkl'
+
+
+class LoadedModel:
+    """Immutable model snapshot, plus caches derived from it"""
+
+    def __init__(self, model, scaler, feature_cols, version, metadata, path):
+        self.model = model
+        # None when the scaler is folded into the model's thresholds
+        self.scaler = scaler
+        self.feature_cols = feature_cols
+        self.version = version
+        self.metadata = metadata
+        self.path = path
+        self.loaded_at = datetime.datetime.now(datetime.timezone.utc)
+        # MicroBatcher for this model, when batching is enabled
+        self.batcher = None
+        self._suitability = {}
+        self._lock = threading.Lock()
+
+    def predict(self, feature_matrix):
+        """Predict every condition for raw feature rows"""
+        if self.scaler is not None:
+            feature_matrix = self.scaler.transform(feature_matrix)
+        return self.model.predict(feature_matrix)
+
+    def suitability(self, catalog):
+        """(foods x conditions) int8 predictions for a catalog, cached per catalog"""
+        matrix = self._suitability.get(catalog.version)
+        if matrix is None:
+            matrix = self.predict(catalog.feature_matrix(self.feature_cols)).astype('int8')
+            with self._lock:
+                self._suitability[catalog.version] = matrix
+        return matrix
+
+    def forget(self, catalog_version):
+        with self._lock:
+            self._suitability.pop(catalog_version, None)
+
+
+def _files_signature(model_dir):
+    """Changes whenever one of the model files is replaced or rewritten"""
+    signature = []
+    for name in (ARTIFACT_FILE, MODEL_FILE, SCALER_FILE, FEATURES_FILE):
+        try:
+            stat = os.stat(os.path.join(model_dir, name))
+        except OSError:
+            signature.append(None)
+            continue
+        signature.append((stat.st_ino, stat.st_size, stat.st_mtime_ns))
+    return tuple(signature)
+
+
+def load_from_dir(model_dir):
+    """LoadedModel from a model directory, or None if it holds no model"""
+    artifact_path = os.path.join(model_dir, ARTIFACT_FILE)
+    model_path = os.path.join(model_dir, MODEL_FILE)
+
+    if os.path.exists(artifact_path):
+        # Memory-mapped artifact on the pure-NumPy tree runtime;
+        # scikit-learn is not imported
+        model, header = load_model(artifact_path)
+        encoding = header['metadata'].get('category_encoding')
+        if encoding is not None and encoding != CATEGORY_ENCODING:
+            raise ValueError("Model was trained with a different category encoding "
+                             f"than featurizer.py: {encoding}")
+        return LoadedModel(model, model.scaler, model.feature_cols,
+                           header['model_version'], header['metadata'], artifact_path)
+
+    if os.path.exists(model_path):
+        model = joblib.load(model_path)
+        scaler = joblib.load(os.path.join(model_dir, SCALER_FILE))
+        feature_cols = joblib.load(os.path.join(model_dir, FEATURES_FILE))
+        with open(model_path, 'rb') as f:
+            version = hashlib.sha256(f.read()).hexdigest()[:12]
+        return LoadedModel(model, scaler, feature_cols, version, {}, model_path)
+
+    return None
+
+
+class ModelStore:
+    """Holds the active LoadedModel and swaps in new ones"""
+
+    def __init__(self, model_dir, warm_fn=None, on_swap=None):
+        # warm_fn(new) prepares a model before it serves traffic;
+        # on_swap(old, new) runs right after the swap
+        self.model_dir = model_dir
+        self.warm_fn = warm_fn
+        self.on_swap = on_swap
+        self.active = None
+        self.last_error = None
+        self._signature = None
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+        self._fork_hook = False
+
+    def reload(self, wait=False):
+        """
+        Load, warm and swap in the model files if they changed. Runs in a
+        background thread unless wait=True. Returns the active model when
+        waiting, otherwise the thread.
+        """
+        if not wait:
+            thread = threading.Thread(target=self._reload, name='model-reload', daemon=True)
+            thread.start()
+            return thread
+        self._reload()
+        return self.active
+
+    def _reload(self):
+        with self._reload_lock:
+            signature = _files_signature(self.model_dir)
+            if signature == self._signature and self.active is not None:
+                return
+            # Files that fail to load are retried once they change again
+            self._signature = signature
+            try:
+                candidate = load_from_dir(self.model_dir)
+                if candidate is None:
+                    print("⚠ Warning: Model files not found. Please train the model first.")
+                    print(f"Expected path: {os.path.join(self.model_dir, ARTIFACT_FILE)}")
+                    return
+                if self.active is not None and candidate.version == self.active.version:
+                    return
+                if self.warm_fn is not None:
+                    self.warm_fn(candidate)
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"✗ Error loading models: {str(e)}")
+                return
+
+            previous, self.active = self.active, candidate
+            self.last_error = None
+            print(f"✓ ML Models loaded successfully! "
+                  f"({os.path.basename(candidate.path)}, version {candidate.version})")
+            if self.on_swap is not None:
+                self.on_swap(previous, candidate)
+
+    def _watch(self, interval):
+        while True:
+            time.sleep(interval)
+            if _files_signature(self.model_dir) != self._signature:
+                self._reload()
+
+    def start_watching(self, interval):
+        """Poll the model directory every interval seconds and reload on change"""
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._watcher = threading.Thread(
+            target=self._watch, args=(interval,), name='model-watcher', daemon=True
+        )
+        self._watcher.start()
+        if not self._fork_hook:
+            # Threads do not survive fork(); restart the watcher in each worker
+            os.register_at_fork(after_in_child=lambda: self._restart_watcher(interval))
+            self._fork_hook = True
+
+    def _restart_watcher(self, interval):
+        self._watcher = None
+        self._reload_lock = threading.Lock()
+        self.start_watching(interval)
@@ -0,0 +1,101 @@
+"""
+Ranked-result cache for recommend-foods
+
+A ranking depends only on the catalog, the model and which health conditions
+are active. With six conditions there are at most 2^6 = 64 condition sets per
+catalog, so almost every request can be answered from this cache.
+"""
+
+import threading
+from collections import OrderedDict
+
+from config import Config
+
+
+def condition_key(active_conditions):
+    """
+    Bitmask of the active conditions over Config.HEALTH_CONDITIONS, plus the
+    number of unrecognised names (they still count towards the score total).
+    """
+    mask = 0
+    unknown = 0
+    for cond in set(active_conditions):
+        if cond in Config.HEALTH_CONDITIONS:
+            mask |= 1 << Config.HEALTH_CONDITIONS.index(cond)
+        else:
+            unknown += 1
+    return mask, unknown
+
+
+class RankingCache:
+    """
+    LRU cache of ranked recommendation lists, bounded by entries and by the
+    records held across all of them, so large topN results cannot pin
+    memory. A list larger than the whole record budget is not cached.
+    """
+
+    def __init__(self, max_entries=Config.RANKING_CACHE_SIZE,
+                 max_records=Config.RANKING_CACHE_MAX_RECORDS):
+        self.max_entries = max_entries
+        self.max_records = max_records
+        self.hits = 0
+        self.misses = 0
+        self.records = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(catalog_version, model_version, active_conditions, top_n):
+        mask, unknown = condition_key(active_conditions)
+        return (catalog_version, model_version, mask, unknown, top_n)
+
+    def get(self, key):
+        """Cached value for key, or None on a miss"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def fits(self, n_records):
+        """Whether a list of n_records can be cached"""
+        return self.max_entries > 0 and n_records <= self.max_records
+
+    def put(self, key, value):
+        if not self.fits(len(value)):
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.records -= len(previous)
+            self._entries[key] = value
+            self.records += len(value)
+            while len(self._entries) > self.max_entries or self.records > self.max_records:
+                _, evicted = self._entries.popitem(last=False)
+                self.records -= len(evicted)
+
+    def invalidate(self, catalog_version=None):
+        """Drop every entry, or only those of one catalog"""
+        with self._lock:
+            if catalog_version is None:
+                self._entries.clear()
+                self.records = 0
+                return
+            for key in [k for k in self._entries if k[0] == catalog_version]:
+                self.records -= len(self._entries.pop(key))
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxEntries': self.max_entries,
+                'records': self.records,
+                'maxRecords': self.max_records,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hitRate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
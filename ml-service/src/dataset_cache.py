@@ -0,0 +1,75 @@
+"""
+Columnar cache of the preprocessed training dataset
+
+Every training run used to parse the dataset CSV, encode the categories and
+build the threshold labels again. The cache keeps the result, the raw
+feature matrix and the label matrix, as .npy files that are memory-mapped on
+load, so a repeat run on an unchanged dataset skips all of that.
+
+An entry is keyed by the SHA-256 of the CSV and by the preprocessing recipe
+(feature columns, category encoding, label rules). Editing the dataset or
+the preprocessing code that the recipe describes leads to a new entry. Only
+the newest entry per dataset file is kept.
+
+Layout:
+    <cache_dir>/<key>/X.npy      float64 features, one row per food
+    <cache_dir>/<key>/y.npy      int64 labels, one column per condition
+    <cache_dir>/<key>/meta.json  source file, rows, columns, recipe
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+CACHE_DIR_NAME = '.dataset_cache'
+
+
+def cache_key(dataset_sha256, recipe):
+    """Entry name for a dataset hash and preprocessing recipe"""
+    payload = json.dumps({'dataset': dataset_sha256, 'recipe': recipe}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def load(cache_dir, key):
+    """(X, y, meta) of an entry with memory-mapped arrays, or None if absent"""
+    entry = os.path.join(cache_dir, key)
+    try:
+        with open(os.path.join(entry, 'meta.json')) as f:
+            meta = json.load(f)
+        X = np.load(os.path.join(entry, 'X.npy'), mmap_mode='r')
+        y = np.load(os.path.join(entry, 'y.npy'), mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+    return X, y, meta
+
+
+def save(cache_dir, key, X, y, meta):
+    """
+    Store an entry, replacing older entries of the same source file. It is
+    written to a temporary directory first and renamed into place, so a
+    reader never sees a partial entry.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix='.tmp-', dir=cache_dir)
+    os.chmod(staging, 0o755)
+    try:
+        np.save(os.path.join(staging, 'X.npy'), np.ascontiguousarray(X, dtype=np.float64))
+        np.save(os.path.join(staging, 'y.npy'), np.ascontiguousarray(y, dtype=np.int64))
+        with open(os.path.join(staging, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+        os.rename(staging, os.path.join(cache_dir, key))
+    except OSError:
+        # Most likely a concurrent run stored the same entry first
+        shutil.rmtree(staging, ignore_errors=True)
+        return
+
+    for name in os.listdir(cache_dir):
+        if name == key or name.startswith('.'):
+            continue
+        entry = load(cache_dir, name)
+        if entry is not None and entry[2].get('source') == meta.get('source'):
+            shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
@@ -6,10 +6,24 @@ This script creates a realistic dataset with 150+ food items including:
 - Food categories
 - Health suitability scores for various conditions
 
+With --rows it instead draws N random foods in vectorized chunks, scoring
+them with the same rules expressed as array selections, and appends each
+chunk to the CSV as soon as it is generated. Memory stays bounded by the
+chunk size, so multi-million-row training and benchmark sets take seconds.
+Chunks are generated on up to --n-jobs worker processes. Every chunk draws
+from its own stream spawned from the --seed SeedSequence, so the output is
+the same for any number of workers.
+
 Usage:
     python generate_dataset.py
+    python generate_dataset.py --rows 10000000 [--chunk-size 250000] [--seed 42] [--n-jobs 4] [--output FILE]
 """
 
+import argparse
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import numpy as np
 import os
@@ -206,22 +220,23 @@ def calculate_health_scores(calories, protein, carbs, category):
     
     return scores
 
+# Nutritional value ranges by category (upper bounds exclusive)
+nutrition_ranges = {
+    'Salads & Greens': {'cal': (150, 350), 'pro': (10, 35), 'carb': (10, 30)},
+    'Low-Carb Meals': {'cal': (200, 400), 'pro': (20, 40), 'carb': (5, 25)},
+    'High-Protein': {'cal': (200, 450), 'pro': (30, 50), 'carb': (10, 40)},
+    'Heart-Healthy': {'cal': (200, 400), 'pro': (15, 35), 'carb': (20, 45)},
+    'Diabetic-Friendly': {'cal': (150, 350), 'pro': (15, 35), 'carb': (10, 30)},
+    'Whole Grains': {'cal': (250, 450), 'pro': (8, 20), 'carb': (40, 65)},
+    'Lean Protein': {'cal': (150, 300), 'pro': (25, 45), 'carb': (0, 15)},
+    'Vegetarian': {'cal': (200, 450), 'pro': (10, 25), 'carb': (30, 60)},
+    'Soups': {'cal': (100, 300), 'pro': (5, 20), 'carb': (15, 40)},
+    'Grilled Items': {'cal': (250, 500), 'pro': (25, 45), 'carb': (10, 35)}
+}
+
 def generate_nutritional_values(category):
     """Generate realistic nutritional values based on category"""
     
-    nutrition_ranges = {
-        'Salads & Greens': {'cal': (150, 350), 'pro': (10, 35), 'carb': (10, 30)},
-        'Low-Carb Meals': {'cal': (200, 400), 'pro': (20, 40), 'carb': (5, 25)},
-        'High-Protein': {'cal': (200, 450), 'pro': (30, 50), 'carb': (10, 40)},
-        'Heart-Healthy': {'cal': (200, 400), 'pro': (15, 35), 'carb': (20, 45)},
-        'Diabetic-Friendly': {'cal': (150, 350), 'pro': (15, 35), 'carb': (10, 30)},
-        'Whole Grains': {'cal': (250, 450), 'pro': (8, 20), 'carb': (40, 65)},
-        'Lean Protein': {'cal': (150, 300), 'pro': (25, 45), 'carb': (0, 15)},
-        'Vegetarian': {'cal': (200, 450), 'pro': (10, 25), 'carb': (30, 60)},
-        'Soups': {'cal': (100, 300), 'pro': (5, 20), 'carb': (15, 40)},
-        'Grilled Items': {'cal': (250, 500), 'pro': (25, 45), 'carb': (10, 35)}
-    }
-    
     ranges = nutrition_ranges.get(category, {'cal': (200, 500), 'pro': (10, 30), 'carb': (20, 50)})
     
     return {
@@ -230,6 +245,223 @@ def generate_nutritional_values(category):
         'carbohydrates': np.random.randint(ranges['carb'][0], ranges['carb'][1])
     }
 
+# Dataset columns, in file order
+DATASET_COLUMNS = [
+    'food_id', 'food_name', 'category', 'calories', 'protein', 'carbohydrates',
+    'diabetes_score', 'hypertension_score', 'heart_disease_score',
+    'cholesterol_score', 'obesity_score', 'kidney_score'
+]
+
+# Rows generated and written at a time by generate_rows()
+CHUNK_SIZE = 250_000
+
+# Worker processes of generate_rows()
+N_JOBS = int(os.environ.get('GENERATE_N_JOBS', os.cpu_count() or 1))
+
+# Per-category lookup arrays, indexed by category code (position in categories)
+_RANGE_LOW = {key: np.array([nutrition_ranges[c][key][0] for c in categories]) for key in ('cal', 'pro', 'carb')}
+_RANGE_HIGH = {key: np.array([nutrition_ranges[c][key][1] for c in categories]) for key in ('cal', 'pro', 'carb')}
+_FOOD_NAMES = [name for c in categories for name in food_items[c]]
+_FOOD_COUNTS = np.array([len(food_items[c]) for c in categories])
+_FOOD_OFFSETS = np.concatenate([[0], np.cumsum(_FOOD_COUNTS)[:-1]])
+
+
+def _category_in(category, *names):
+    return np.isin(category, [categories.index(name) for name in names])
+
+
+def _draw_scores(rng, conditions, ranges, default):
+    """
+    Random score per row from the range of the first matching condition,
+    like an if/elif/else chain of np.random.randint(low, high) calls
+    """
+    low = np.select(conditions, [r[0] for r in ranges], default[0])
+    high = np.select(conditions, [r[1] for r in ranges], default[1])
+    return rng.integers(low, high)
+
+
+def calculate_health_scores_vectorized(rng, calories, protein, carbs, category):
+    """
+    calculate_health_scores() for arrays of rows; category holds category
+    codes. Returns a dict of score arrays.
+    """
+    scores = {}
+
+    scores['diabetes_score'] = _draw_scores(
+        rng, [(carbs < 20) & (calories < 300), (carbs > 50) | (calories > 600)], [(8, 11), (1, 4)], (4, 8)
+    )
+    scores['diabetes_score'] = np.where(_category_in(category, 'Diabetic-Friendly'),
+                                        np.minimum(10, scores['diabetes_score'] + 2), scores['diabetes_score'])
+
+    scores['hypertension_score'] = _draw_scores(
+        rng, [(calories < 300) & (carbs < 40), calories > 600], [(7, 11), (1, 4)], (4, 8)
+    )
+    scores['hypertension_score'] = np.where(_category_in(category, 'Soups', 'Salads & Greens'),
+                                            np.maximum(6, scores['hypertension_score']),
+                                            scores['hypertension_score'])
+
+    scores['heart_disease_score'] = _draw_scores(
+        rng, [(protein > 25) & (calories < 400), calories > 600], [(7, 11), (1, 5)], (4, 8)
+    )
+    scores['heart_disease_score'] = np.where(_category_in(category, 'Heart-Healthy', 'Lean Protein'),
+                                             np.minimum(10, scores['heart_disease_score'] + 2),
+                                             scores['heart_disease_score'])
+
+    scores['cholesterol_score'] = _draw_scores(
+        rng,
+        [_category_in(category, 'Vegetarian', 'Salads & Greens', 'Whole Grains'),
+         (protein > 30) & _category_in(category, 'Lean Protein', 'Grilled Items')],
+        [(7, 11), (6, 9)], (3, 7)
+    )
+
+    scores['obesity_score'] = _draw_scores(
+        rng, [(calories < 250) & (protein > 20), calories > 500], [(8, 11), (1, 4)], (4, 8)
+    )
+    scores['obesity_score'] = np.where(_category_in(category, 'Low-Carb Meals'),
+                                       np.minimum(10, scores['obesity_score'] + 2), scores['obesity_score'])
+
+    scores['kidney_score'] = _draw_scores(
+        rng, [(protein < 25) & (calories < 400), protein > 40], [(6, 10), (1, 4)], (4, 7)
+    )
+
+    return scores
+
+
+def generate_chunk(rng, first_id, n_rows):
+    """
+    Columns of n_rows random foods with ids from first_id. food_name and
+    category hold indexes into _FOOD_NAMES and categories.
+    """
+    category = rng.integers(0, len(categories), n_rows)
+    name = _FOOD_OFFSETS[category] + rng.integers(0, _FOOD_COUNTS[category])
+    calories = rng.integers(_RANGE_LOW['cal'][category], _RANGE_HIGH['cal'][category])
+    protein = rng.integers(_RANGE_LOW['pro'][category], _RANGE_HIGH['pro'][category])
+    carbs = rng.integers(_RANGE_LOW['carb'][category], _RANGE_HIGH['carb'][category])
+    scores = calculate_health_scores_vectorized(rng, calories, protein, carbs, category)
+
+    return {
+        'food_id': np.arange(first_id, first_id + n_rows),
+        'food_name': name,
+        'category': category,
+        'calories': calories,
+        'protein': protein,
+        'carbohydrates': carbs,
+        **scores
+    }
+
+
+def _int_field(values):
+    """(lengths, left-aligned bytes) of a CSV field of non-negative integers"""
+    values = np.asarray(values, dtype=np.int64)
+    if len(values) and values.max() < 1000:
+        # Small values (nutrition, scores): look up their text
+        return _text_field([str(value) for value in range(values.max() + 1)], values)
+
+    width = len(str(values.max())) if len(values) else 1
+    lengths = np.ones(len(values), dtype=np.int64)
+    for digits in range(1, width):
+        lengths += values >= 10 ** digits
+    # Digit j of a value, counted from the left, for every j < its length
+    shift = np.maximum(lengths[:, None] - 1 - np.arange(width), 0)
+    chars = (values[:, None] // 10 ** shift % 10 + ord('0')).astype(np.uint8)
+    return lengths, chars
+
+
+def _text_field(table, index):
+    """(lengths, left-aligned bytes) of a CSV field of strings from a lookup table"""
+    quoted = ['"' + text.replace('"', '""') + '"' if ',' in text or '"' in text else text for text in table]
+    encoded = [text.encode('utf-8') for text in quoted]
+    chars = np.array(encoded, dtype=bytes)
+    chars = chars.view(np.uint8).reshape(len(encoded), chars.dtype.itemsize)
+    lengths = np.array([len(text) for text in encoded])
+    return lengths[index], chars[index]
+
+
+def chunk_csv(chunk):
+    """
+    CSV lines of a generate_chunk() result, as bytes, several times faster
+    than DataFrame.to_csv. Every field gets a fixed-width slot in a byte
+    matrix with one row per line; dropping the unused bytes of each slot
+    leaves the lines back to back.
+    """
+    fields = [
+        _text_field(_FOOD_NAMES, chunk[col]) if col == 'food_name'
+        else _text_field(categories, chunk[col]) if col == 'category'
+        else _int_field(chunk[col])
+        for col in DATASET_COLUMNS
+    ]
+    # Each slot is followed by a comma, the last one by a newline
+    width = sum(chars.shape[1] + 1 for _, chars in fields)
+    n_rows = len(chunk['food_id'])
+    matrix = np.full((n_rows, width), ord(','), dtype=np.uint8)
+    keep = np.ones((n_rows, width), dtype=bool)
+    matrix[:, -1] = ord('\n')
+
+    start = 0
+    for lengths, chars in fields:
+        end = start + chars.shape[1]
+        matrix[:, start:end] = chars
+        keep[:, start:end] = np.arange(chars.shape[1]) < lengths[:, None]
+        start = end + 1
+    return matrix[keep].tobytes()
+
+
+def write_shard(path, stream, first_id, n_rows):
+    """Generate one chunk from its own random stream and write it to path"""
+    with open(path, 'wb') as f:
+        f.write(chunk_csv(generate_chunk(np.random.default_rng(stream), first_id, n_rows)))
+    return path
+
+
+def generate_rows(n_rows, output_file, chunk_size=CHUNK_SIZE, seed=42, n_jobs=N_JOBS):
+    """
+    Write n_rows random foods to output_file, chunk_size rows at a time.
+    With several workers each chunk is written to its own shard file, and
+    the shards are appended to output_file in order. Every worker holds one
+    chunk in memory at a time.
+    """
+    print("="*70)
+    print(f"🍽️  GENERATING {n_rows:,} FOOD ROWS")
+    print("="*70)
+
+    chunks = [(first + 1, min(chunk_size, n_rows - first)) for first in range(0, n_rows, chunk_size)]
+    # One stream per chunk rather than per worker, so the rows do not depend
+    # on how many workers generate them
+    streams = np.random.SeedSequence(seed).spawn(len(chunks))
+    workers = max(1, min(n_jobs, len(chunks)))
+    print(f"\n⚡ {len(chunks)} chunks of up to {chunk_size:,} rows on "
+          f"{workers} worker{'s' if workers > 1 else ''}")
+
+    started = time.perf_counter()
+    with open(output_file, 'wb') as f:
+        f.write((','.join(DATASET_COLUMNS) + '\n').encode('utf-8'))
+        if workers == 1:
+            for stream, (first_id, n_chunk) in zip(streams, chunks):
+                f.write(chunk_csv(generate_chunk(np.random.default_rng(stream), first_id, n_chunk)))
+                print(f"  ✓ Rows {first_id:,}-{first_id + n_chunk - 1:,}")
+        else:
+            shard_dir = output_file + '.shards'
+            os.makedirs(shard_dir, exist_ok=True)
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [
+                    pool.submit(write_shard, os.path.join(shard_dir, f'part-{idx:05d}.csv'),
+                                stream, first_id, n_chunk)
+                    for idx, (stream, (first_id, n_chunk)) in enumerate(zip(streams, chunks))
+                ]
+                for future, (first_id, n_chunk) in zip(futures, chunks):
+                    shard_path = future.result()
+                    with open(shard_path, 'rb') as shard:
+                        shutil.copyfileobj(shard, f, 1 << 20)
+                    os.remove(shard_path)
+                    print(f"  ✓ Rows {first_id:,}-{first_id + n_chunk - 1:,}")
+            os.rmdir(shard_dir)
+    elapsed = time.perf_counter() - started
+
+    print(f"\n✅ {n_rows:,} rows written to {output_file}")
+    print(f"  - File size: {os.path.getsize(output_file) / 1024 ** 2:.1f} MB")
+    print(f"  - Time: {elapsed:.2f} s ({n_rows / elapsed:,.0f} rows/s)")
+
+
 def generate_dataset():
     """Generate the complete dataset"""
     print("="*70)
@@ -313,6 +545,24 @@ def generate_dataset():
     
     return df
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Generate the food health dataset')
+    parser.add_argument('--rows', type=int,
+                        help='generate this many random foods in vectorized chunks')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='rows per chunk')
+    parser.add_argument('--seed', type=int, default=42, help='random seed of --rows')
+    parser.add_argument('--n-jobs', type=int, default=N_JOBS,
+                        help='worker processes of --rows (default: GENERATE_N_JOBS or all cores)')
+    parser.add_argument('--output', default='food_health_dataset.csv', help='output CSV of --rows')
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    generate_dataset()
+    args = parse_args()
+    if args.rows:
+        output = os.path.join(BASE_PATH, args.output) if BASE_PATH else args.output
+        generate_rows(args.rows, output, chunk_size=args.chunk_size, seed=args.seed,
+                      n_jobs=args.n_jobs)
+    else:
+        generate_dataset()
 
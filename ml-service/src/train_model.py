@@ -1,9 +1,19 @@
+import math
+import time
+
+# Start-up time (imports) is reported with the stage timings
+STARTED_AT = time.perf_counter()
+
+import argparse
+import datetime
+import hashlib
+import io
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler, LabelEncoder
+import sklearn
+from sklearn.base import clone
+from sklearn.model_selection import KFold, ParameterGrid, train_test_split
+from sklearn.preprocessing import StandardScaler
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 from sklearn.tree import DecisionTreeClassifier
 from sklearn.metrics import accuracy_score, classification_report
@@ -12,12 +22,33 @@ import joblib
 import warnings
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+
+# Serving runtime modules live in ml-service/, next to app.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from featurizer import (
+    CATEGORY_ENCODING, DEFAULT_CATEGORY, FEATURE_COLUMNS, NUTRIENT_COLUMNS, features_from_frame
+)
+from forest_runtime import MASK_BITS, CompiledForest, compile_model
+from model_artifact import ARTIFACT_FILE, load_model, read_header, save_artifact
+from model_compaction import MAX_ACCURACY_LOSS, compact_model
+import dataset_cache
 
 warnings.filterwarnings('ignore')
 
-# Plot style
-sns.set_style("whitegrid")
-plt.rcParams['figure.figsize'] = (12, 8)
+
+def load_plotting():
+    """
+    Import and style matplotlib and seaborn. Imported on first use only,
+    so headless training never pays for them.
+    """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    # Plot style
+    sns.set_style("whitegrid")
+    plt.rcParams['figure.figsize'] = (12, 8)
+    return plt, sns
 
 # =====================================================================
 # GOOGLE COLAB SETUP
@@ -59,14 +90,197 @@ BASE_PATH, IN_COLAB = setup_colab_environment()
 # Change this if your file is in a subfolder of My Drive
 DATASET_NAME = 'food_health_dataset.csv'  # Must exist under BASE_PATH
 
+# Total CPU cores used to train the candidate models
+N_JOBS = int(os.environ.get('TRAIN_N_JOBS', os.cpu_count() or 1))
+
+# Fewest trees in one task when a forest fit is split over the cores
+MIN_FOREST_BLOCK = 10
+
+# Hyperparameter grids explored by search_models() (random_state is always 42)
+SEARCH_SPACE = {
+    'Random Forest': (RandomForestClassifier, {
+        'n_estimators': [25, 50, 100, 200],
+        'max_depth': [6, 10, 16],
+        'min_samples_split': [2, 5]
+    }),
+    'Gradient Boosting': (GradientBoostingClassifier, {
+        'n_estimators': [50, 100, 200],
+        'max_depth': [3, 5],
+        'learning_rate': [0.05, 0.1]
+    }),
+    'Decision Tree': (DecisionTreeClassifier, {
+        'max_depth': [4, 6, 8, 12],
+        'min_samples_split': [2, 5]
+    })
+}
+
+# Accuracy given up per 1000 leaf mask words of inference cost when ranking
+LATENCY_WEIGHT = 0.005
+
+# Smallest training subset used by the first successive-halving rung
+MIN_SEARCH_ROWS = 250
+
+# Binary suitability labels: a score >= LABEL_THRESHOLD is suitable
+LABEL_THRESHOLD = 7
+SCORE_LABEL_PAIRS = [
+    ('diabetes_score', 'diabetes_suitable'),
+    ('hypertension_score', 'hypertension_suitable'),
+    ('heart_disease_score', 'heart_disease_suitable'),
+    ('cholesterol_score', 'cholesterol_suitable'),
+    ('obesity_score', 'obesity_suitable'),
+    ('kidney_score', 'kidney_suitable')
+]
+TARGET_COLUMNS = [label_col for _, label_col in SCORE_LABEL_PAIRS]
+
+# Boosting stages added to each affected condition by an incremental update;
+# forests get trees in proportion to the new rows instead
+UPDATE_TREES = 10
+
+# Share of the training rows held out to choose the trees of a compact
+# artifact (--compact-trees); the test set stays untouched for reporting
+VALIDATION_SIZE = 0.2
+
+# z-score of a condition's share of suitable foods in the appended rows,
+# against the share the model was trained on, above which an update refits
+# that condition instead of adding trees
+LABEL_SHIFT_Z = 3.0
+
+
+# Training data of the worker processes, set once per worker by the pool
+_worker_data = {}
+
+
+def _init_worker(data):
+    _worker_data.update(data)
+
+
+def fit_condition(base_model, target_idx, trees=None):
+    """
+    Fit a copy of base_model on one condition, like MultiOutputClassifier
+    does for each target. The estimator's fixed random_state makes the
+    result independent of the process or order it runs in.
+
+    trees=(start, stop) fits only those trees of a random forest. Warm start
+    draws the random states of the first start trees before growing new
+    ones, so the block is identical to the same trees of a full fit.
+    """
+    estimator = clone(base_model)
+    if trees is not None:
+        start, stop = trees
+        estimator.set_params(n_estimators=stop, warm_start=True)
+        # Placeholders: warm start only counts the trees already grown
+        estimator.estimators_ = [None] * start
+    estimator.fit(_worker_data['X'], _worker_data['y'][:, target_idx])
+    if trees is not None:
+        estimator.estimators_ = estimator.estimators_[start:]
+    return estimator
+
+
+def merge_forest_blocks(base_model, blocks):
+    """One forest from the consecutive tree blocks fitted by fit_condition"""
+    forest = blocks[-1]
+    forest.estimators_ = [tree for block in blocks for tree in block.estimators_]
+    forest.set_params(n_estimators=base_model.n_estimators, warm_start=base_model.warm_start)
+    return forest
+
+
+def fit_cost(base_model):
+    """Rough relative cost of one fit: its number of trees"""
+    return getattr(base_model, 'n_estimators', 1)
+
+
+def multi_output_model(base_model, estimators):
+    """MultiOutputClassifier from per-condition estimators fitted separately"""
+    model = MultiOutputClassifier(base_model)
+    model.estimators_ = estimators
+    model.n_features_in_ = estimators[0].n_features_in_
+    return model
+
+
+def add_labels(df):
+    """Add the binary suitability label columns to a dataset frame"""
+    for score_col, label_col in SCORE_LABEL_PAIRS:
+        if score_col not in df.columns:
+            raise ValueError(f"Missing required column in dataset: {score_col}")
+        df[label_col] = (df[score_col] >= LABEL_THRESHOLD).astype(int)
+
+
+def label_rates(y, target_cols):
+    """Share of suitable foods per condition"""
+    return {col: float(rate) for col, rate in zip(target_cols, np.asarray(y).mean(axis=0))}
+
+
+def preprocessing_recipe():
+    """Everything preprocess_data() output depends on besides the CSV (dataset cache key)"""
+    return {
+        'feature_columns': FEATURE_COLUMNS,
+        'category_encoding': CATEGORY_ENCODING,
+        'default_category': DEFAULT_CATEGORY,
+        'score_label_pairs': SCORE_LABEL_PAIRS,
+        'label_threshold': LABEL_THRESHOLD
+    }
+
+
+def dataset_fingerprint(path, n_bytes=None):
+    """Size and SHA-256 of the first n_bytes of a dataset file (all of it by default)"""
+    if n_bytes is None:
+        n_bytes = os.path.getsize(path)
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        remaining = n_bytes
+        while remaining > 0:
+            chunk = f.read(min(remaining, 1 << 20))
+            if not chunk:
+                break
+            digest.update(chunk)
+            remaining -= len(chunk)
+    return {'bytes': n_bytes - remaining, 'sha256': digest.hexdigest()}
+
+
+def inference_cost(model):
+    """
+    Leaf mask words per row in the serving runtime (forest_runtime.py), which
+    looks up every tree's leaves 64 at a time, as many words as the tree with
+    the most leaves needs. Unlike a timing, it is deterministic, so the
+    search result is reproducible.
+    """
+    trees = []
+    for estimator in model.estimators_:
+        if hasattr(estimator, 'tree_'):
+            trees.append(estimator.tree_)
+        else:
+            trees.extend(tree.tree_ for tree in np.ravel(estimator.estimators_))
+    return len(trees) * -(-max(tree.n_leaves for tree in trees) // MASK_BITS)
+
+
+def evaluate_candidate(base_model, fold_idx, n_rows):
+    """
+    Fit base_model on the first n_rows of a cached scaled fold and score it
+    on the fold's validation rows. Returns (accuracy, inference cost).
+    """
+    X_train, y_train, X_val, y_val = _worker_data['folds'][fold_idx]
+    model = MultiOutputClassifier(base_model).fit(X_train[:n_rows], y_train[:n_rows])
+    return accuracy_score(y_val, model.predict(X_val)), inference_cost(model)
+
 
 class FoodRecommendationModel:
     """Food Recommendation ML Model Trainer"""
 
-    def __init__(self, dataset_path=DATASET_NAME):
+    def __init__(self, dataset_path=DATASET_NAME, n_jobs=N_JOBS, use_cache=True, validation_size=0.0):
         """Initialize the model trainer"""
         self.dataset_path = dataset_path
+        self.n_jobs = max(1, n_jobs)
+        self.use_cache = use_cache
+        # Share of the training rows held out as a validation set (not trained on)
+        self.validation_size = validation_size
         self.df = None
+        # Resolved dataset path and its fingerprint, recorded by load_data()
+        self.dataset_file = None
+        self.dataset_info = None
+        # Dataset cache directory, entry key and (X, y, meta) on a cache hit
+        self.cache_dir = None
+        self.cache_key = None
+        self.cached = None
 
         self.feature_cols = None
         self.target_cols = None
@@ -75,6 +289,8 @@ class FoodRecommendationModel:
         self.X_test = None
         self.y_train = None
         self.y_test = None
+        self.X_val = None
+        self.y_val = None
 
         self.X_train_scaled = None
         self.X_test_scaled = None
@@ -82,22 +298,39 @@ class FoodRecommendationModel:
         self.scaler = None
         self.model = None
 
+        # Scaled k-fold splits of the training set, by number of folds
+        self._folds = {}
+        # Extra artifact metadata (search result, lineage)
+        self.metadata = {}
+
     def load_data(self):
         """Load dataset from CSV file"""
         print("\n" + "="*70)
         print("📊 LOADING DATASET")
         print("="*70)
 
-        # Build full path
-        if os.path.isabs(self.dataset_path):
-            full_dataset_path = self.dataset_path
-        elif BASE_PATH:
-            full_dataset_path = os.path.join(BASE_PATH, self.dataset_path)
-        else:
-            full_dataset_path = self.dataset_path
+        full_dataset_path = self._dataset_file()
 
         try:
+            # Lets a later update_model() find the rows appended since
+            fingerprint = dataset_fingerprint(full_dataset_path)
+            self.dataset_file = full_dataset_path
+
+            if self.use_cache:
+                self.cache_dir = os.path.join(os.path.dirname(os.path.abspath(full_dataset_path)),
+                                              dataset_cache.CACHE_DIR_NAME)
+                self.cache_key = dataset_cache.cache_key(fingerprint['sha256'], preprocessing_recipe())
+                self.cached = dataset_cache.load(self.cache_dir, self.cache_key)
+            if self.cached is not None:
+                self.dataset_info = {'rows': self.cached[2]['rows'], **fingerprint}
+                print(f"✓ Dataset loaded from cache (CSV parsing and preprocessing skipped)")
+                print(f"  - Path: {full_dataset_path}")
+                print(f"  - Cache: {os.path.join(self.cache_dir, self.cache_key)}")
+                print(f"  - Food items: {self.cached[2]['rows']}")
+                return True
+
             self.df = pd.read_csv(full_dataset_path)
+            self.dataset_info = {'rows': len(self.df), **fingerprint}
             print(f"✓ Dataset loaded successfully!")
             print(f"  - Path: {full_dataset_path}")
             print(f"  - Shape: {self.df.shape}")
@@ -120,12 +353,24 @@ class FoodRecommendationModel:
             print(f"✗ Error loading dataset: {str(e)}")
             return False
 
+    def _dataset_file(self):
+        """Full path of the dataset CSV"""
+        if os.path.isabs(self.dataset_path):
+            return self.dataset_path
+        if BASE_PATH:
+            return os.path.join(BASE_PATH, self.dataset_path)
+        return self.dataset_path
+
     def explore_data(self):
         """Perform exploratory data analysis"""
         print("\n" + "="*70)
         print("🔍 EXPLORATORY DATA ANALYSIS")
         print("="*70)
 
+        # A cache hit skips the CSV, but the analysis needs the full table
+        if self.df is None:
+            self.df = pd.read_csv(self.dataset_file)
+
         print("\n📊 Dataset Info:")
         print("-" * 70)
         print(self.df.info())
@@ -155,6 +400,7 @@ class FoodRecommendationModel:
     def _create_visualizations(self):
         """Create data visualizations"""
         print("\n📊 Creating visualizations...")
+        plt, sns = load_plotting()
 
         # 1. Distribution of health scores
         score_cols = [
@@ -262,47 +508,29 @@ class FoodRecommendationModel:
         print("⚙ DATA PREPROCESSING")
         print("="*70)
 
-        # Encode categorical variable
-        if 'category' not in self.df.columns:
-            raise ValueError("Dataset must contain a 'category' column.")
-
-        label_encoder = LabelEncoder()
-        self.df['category_encoded'] = label_encoder.fit_transform(self.df['category'])
-        print("\n✓ Category encoding completed")
-        print(f"  - Categories: {list(label_encoder.classes_)}")
-
-        # Create binary suitability labels (score >= 7 is suitable)
-        threshold = 7
-        score_label_pairs = [
-            ('diabetes_score', 'diabetes_suitable'),
-            ('hypertension_score', 'hypertension_suitable'),
-            ('heart_disease_score', 'heart_disease_suitable'),
-            ('cholesterol_score', 'cholesterol_suitable'),
-            ('obesity_score', 'obesity_suitable'),
-            ('kidney_score', 'kidney_suitable')
-        ]
-
-        for score_col, label_col in score_label_pairs:
-            if score_col not in self.df.columns:
-                raise ValueError(f"Missing required column in dataset: {score_col}")
-            self.df[label_col] = (self.df[score_col] >= threshold).astype(int)
-
-        print(f"\n✓ Binary labels created (threshold: {threshold})")
-
         # Define feature and target columns
-        self.feature_cols = ['calories', 'protein', 'carbohydrates', 'category_encoded']
-        self.target_cols = [
-            'diabetes_suitable', 'hypertension_suitable',
-            'heart_disease_suitable', 'cholesterol_suitable',
-            'obesity_suitable', 'kidney_suitable'
-        ]
+        self.feature_cols = list(FEATURE_COLUMNS)
+        self.target_cols = list(TARGET_COLUMNS)
 
-        for col in self.feature_cols:
-            if col not in self.df.columns:
-                raise ValueError(f"Missing feature column: {col}")
-
-        X = self.df[self.feature_cols]
-        y = self.df[self.target_cols]
+        if self.cached is not None:
+            X, y_values, _ = self.cached
+            y = pd.DataFrame(y_values, columns=self.target_cols)
+            print("\n✓ Encoded features and labels read from the dataset cache")
+        else:
+            X, y = self._features_and_labels()
+            if self.use_cache:
+                dataset_cache.save(self.cache_dir, self.cache_key, X, y.to_numpy(), {
+                    'source': os.path.abspath(self.dataset_file),
+                    'rows': len(X),
+                    'feature_columns': self.feature_cols,
+                    'target_columns': self.target_cols,
+                    'recipe': preprocessing_recipe()
+                })
+                print(f"\n✓ Dataset cache written: {os.path.join(self.cache_dir, self.cache_key)}")
+
+        if self.dataset_info is not None:
+            # Lets update_model() tell whether appended rows shift the labels
+            self.dataset_info['label_rates'] = label_rates(y, self.target_cols)
 
         print(f"\n✓ Features prepared:")
         print(f"  - Feature shape: {X.shape}")
@@ -316,8 +544,15 @@ class FoodRecommendationModel:
             X, y, test_size=0.2, random_state=42
         )
 
+        if self.validation_size:
+            self.X_train, self.X_val, self.y_train, self.y_val = train_test_split(
+                self.X_train, self.y_train, test_size=self.validation_size, random_state=42
+            )
+
         print(f"\n✓ Data split completed:")
         print(f"  - Training set: {self.X_train.shape[0]} samples")
+        if self.X_val is not None:
+            print(f"  - Validation set: {self.X_val.shape[0]} samples")
         print(f"  - Testing set: {self.X_test.shape[0]} samples")
 
         # Feature scaling
@@ -327,6 +562,26 @@ class FoodRecommendationModel:
 
         print(f"\n✓ Feature scaling completed")
 
+    def _features_and_labels(self):
+        """Featurize self.df and build its labels; returns (X, y)"""
+        for col in NUTRIENT_COLUMNS + ['category']:
+            if col not in self.df.columns:
+                raise ValueError(f"Dataset must contain a '{col}' column.")
+
+        # The ML service's featurizer encodes the categories
+        X = features_from_frame(self.df, self.feature_cols)
+        print("\n✓ Features built by the shared featurizer")
+        print(f"  - Categories: {list(CATEGORY_ENCODING)}")
+        unknown = sorted(set(self.df['category'].dropna()) - set(CATEGORY_ENCODING))
+        if unknown:
+            print(f"  ⚠ Unknown categories encoded as '{DEFAULT_CATEGORY}': {unknown}")
+
+        # Create binary suitability labels
+        add_labels(self.df)
+        print(f"\n✓ Binary labels created (threshold: {LABEL_THRESHOLD})")
+
+        return X, self.df[self.target_cols]
+
     def train_models(self):
         """Train multiple ML models and select the best one"""
         print("\n" + "="*70)
@@ -353,12 +608,10 @@ class FoodRecommendationModel:
         }
 
         results = {}
+        fitted = self._fit_models(models)
 
-        for name, base_model in models.items():
-            print(f"\n🔄 Training {name}...")
-            model = MultiOutputClassifier(base_model)
-            model.fit(self.X_train_scaled, self.y_train)
-
+        # Results in candidate order, so ties resolve the same way every run
+        for name, model in fitted.items():
             y_pred = model.predict(self.X_test_scaled)
             accuracy = accuracy_score(self.y_test, y_pred)
 
@@ -379,7 +632,362 @@ class FoodRecommendationModel:
 
         return results, best_model_name
 
-    def evaluate_model(self):
+    def _run_tasks(self, fn, tasks, data, costs=None):
+        """
+        fn(*task) for every task on up to n_jobs worker processes, results in
+        task order. data is handed to each worker once (see _worker_data).
+        With costs, the costliest tasks are started first, so a long task
+        does not start last and run alone.
+        """
+        if self.n_jobs > 1 and len(tasks) > 1:
+            order = range(len(tasks)) if costs is None else sorted(
+                range(len(tasks)), key=lambda position: -costs[position]
+            )
+            with ProcessPoolExecutor(max_workers=min(self.n_jobs, len(tasks)),
+                                     initializer=_init_worker, initargs=(data,)) as pool:
+                futures = {position: pool.submit(fn, *tasks[position]) for position in order}
+                return [futures[position].result() for position in range(len(tasks))]
+
+        _init_worker(data)
+        try:
+            return [fn(*task) for task in tasks]
+        finally:
+            _worker_data.clear()
+
+    def _fit_conditions(self, fits, X, y):
+        """
+        One fitted estimator per (base model, condition) in fits. Every fit
+        is a task; a random forest larger than about half a core's share of
+        the work is split into blocks of trees, so the cores stay busy until
+        the end instead of waiting on the largest fits.
+        """
+        costs = [fit_cost(base_model) for base_model, _ in fits]
+        block_size = max(MIN_FOREST_BLOCK, math.ceil(sum(costs) / (2 * self.n_jobs)))
+
+        tasks, task_costs, owners = [], [], []
+        for position, (base_model, idx) in enumerate(fits):
+            n_trees = costs[position]
+            if self.n_jobs > 1 and isinstance(base_model, RandomForestClassifier) and n_trees > block_size:
+                bounds = np.linspace(0, n_trees, math.ceil(n_trees / block_size) + 1).round().astype(int)
+                for start, stop in zip(bounds[:-1], bounds[1:]):
+                    tasks.append((base_model, idx, (int(start), int(stop))))
+                    task_costs.append(int(stop - start))
+                    owners.append(position)
+            else:
+                tasks.append((base_model, idx))
+                task_costs.append(n_trees)
+                owners.append(position)
+
+        results = self._run_tasks(fit_condition, tasks, {'X': X, 'y': y}, costs=task_costs)
+        fitted = []
+        for position, (base_model, _) in enumerate(fits):
+            parts = [result for result, owner in zip(results, owners) if owner == position]
+            fitted.append(parts[0] if len(parts) == 1 else merge_forest_blocks(base_model, parts))
+        return fitted, len(tasks)
+
+    def _fit_models(self, models):
+        """
+        Fit each named base model on the scaled training set, every
+        condition separately, spread over the cores (see _fit_conditions).
+        """
+        y_train = np.asarray(self.y_train)
+        fits = [(models[name], idx) for name in models for idx in range(y_train.shape[1])]
+
+        workers = min(self.n_jobs, len(fits))
+        print(f"\n⚡ Training {len(fits)} estimators "
+              f"({len(models)} x {y_train.shape[1]} conditions) on {workers} core{'s' if workers > 1 else ''}")
+        for name in models:
+            print(f"🔄 Training {name}...")
+        fitted, n_tasks = self._fit_conditions(fits, self.X_train_scaled, y_train)
+        if n_tasks > len(fits):
+            print(f"  - {n_tasks} tasks (random forests split into blocks of trees)")
+
+        n_targets = y_train.shape[1]
+        return {
+            name: multi_output_model(models[name], fitted[idx * n_targets:(idx + 1) * n_targets])
+            for idx, name in enumerate(models)
+        }
+
+    def _scaled_folds(self, n_splits):
+        """
+        k-fold splits of the training set, each scaled with a scaler fitted on
+        its own training rows. Computed once and reused by every candidate.
+        Training rows are shuffled, so any prefix is a random subset.
+        """
+        if n_splits not in self._folds:
+            X = np.asarray(self.X_train, dtype=np.float64)
+            y = np.asarray(self.y_train)
+            rng = np.random.default_rng(42)
+            folds = []
+            for train_idx, val_idx in KFold(n_splits, shuffle=True, random_state=42).split(X):
+                train_idx = rng.permutation(train_idx)
+                scaler = StandardScaler().fit(X[train_idx])
+                folds.append((scaler.transform(X[train_idx]), y[train_idx],
+                              scaler.transform(X[val_idx]), y[val_idx]))
+            self._folds[n_splits] = folds
+        return self._folds[n_splits]
+
+    def search_models(self, n_splits=5, factor=3, latency_weight=LATENCY_WEIGHT):
+        """
+        Successive-halving search over SEARCH_SPACE with k-fold cross-validation.
+        Every rung fits the surviving candidates on all folds, keeps the best
+        1/factor and gives the next rung factor times more training rows.
+        Candidates are ranked by mean CV accuracy minus latency_weight per
+        1000 leaf mask words of inference cost. The winner is refitted on the whole
+        training set and becomes self.model.
+        """
+        print("\n" + "="*70)
+        print("🔎 HYPERPARAMETER SEARCH (successive halving)")
+        print("="*70)
+
+        candidates = [
+            (f"{name} ({', '.join(f'{key}={value}' for key, value in params.items())})",
+             name, estimator_cls(random_state=42, **params))
+            for name, (estimator_cls, grid) in SEARCH_SPACE.items()
+            for params in ParameterGrid(grid)
+        ]
+        folds = self._scaled_folds(n_splits)
+        max_rows = min(len(fold[0]) for fold in folds)
+        n_rungs = max(1, math.ceil(math.log(len(candidates), factor)))
+        n_rows = max(min(MIN_SEARCH_ROWS, max_rows), max_rows // factor ** (n_rungs - 1))
+
+        print(f"\n  - Candidates: {len(candidates)}, {n_splits} folds, {n_rungs} rungs, "
+              f"{self.n_jobs} core{'s' if self.n_jobs > 1 else ''}")
+        print(f"  - Latency weight: {latency_weight} accuracy per 1000 leaf mask words")
+
+        survivors = list(range(len(candidates)))
+        scores = {}
+        for rung in range(n_rungs):
+            tasks = [(candidates[idx][2], fold_idx, n_rows)
+                     for idx in survivors for fold_idx in range(n_splits)]
+            outcomes = self._run_tasks(evaluate_candidate, tasks, {'folds': folds},
+                                       costs=[fit_cost(task[0]) for task in tasks])
+
+            for position, idx in enumerate(survivors):
+                fold_outcomes = outcomes[position * n_splits:(position + 1) * n_splits]
+                accuracy = float(np.mean([acc for acc, _ in fold_outcomes]))
+                cost = max(cost for _, cost in fold_outcomes)
+                scores[idx] = {
+                    'candidate': candidates[idx][0],
+                    'rung': rung,
+                    'rows': n_rows,
+                    'cv_accuracy': accuracy,
+                    'inference_cost': cost,
+                    'objective': accuracy - latency_weight * cost / 1000
+                }
+
+            # Stable sort: ties keep SEARCH_SPACE order
+            survivors.sort(key=lambda idx: -scores[idx]['objective'])
+            print(f"\n  Rung {rung + 1}: {len(tasks) // n_splits} candidates on {n_rows} rows")
+            for idx in survivors[:3]:
+                score = scores[idx]
+                print(f"    {score['candidate']:62s} acc {score['cv_accuracy']:.4f} "
+                      f"cost {score['inference_cost']:6d}")
+
+            survivors = survivors[:max(1, math.ceil(len(survivors) / factor))]
+            n_rows = min(max_rows, n_rows * factor)
+
+        best = survivors[0]
+        label, name, base_model = candidates[best]
+        self.model = self._fit_models({label: base_model})[label]
+        test_accuracy = accuracy_score(self.y_test, self.model.predict(self.X_test_scaled))
+
+        # Measured latency of the chosen model on the serving runtime
+        compiled = CompiledForest(compile_model(self.model, self.scaler, self.feature_cols))
+        X_test = np.asarray(self.X_test, dtype=np.float64)[:1000]
+        timings = []
+        for _ in range(5):
+            start = time.perf_counter()
+            compiled.predict(X_test)
+            timings.append(time.perf_counter() - start)
+
+        print(f"\n🏆 Best Model: {label}")
+        print(f"  - CV accuracy:    {scores[best]['cv_accuracy']:.4f}")
+        print(f"  - Test accuracy:  {test_accuracy:.4f}")
+        print(f"  - Inference cost: {scores[best]['inference_cost']} leaf mask words per row "
+              f"({np.median(timings) * 1000:.1f} ms per {len(X_test)} rows)")
+
+        self.metadata['search'] = {
+            'candidate': label,
+            'cv_accuracy': scores[best]['cv_accuracy'],
+            'test_accuracy': test_accuracy,
+            'inference_cost': scores[best]['inference_cost'],
+            'latency_weight': latency_weight,
+            'folds': n_splits
+        }
+        return sorted(scores.values(), key=lambda score: (-score['rung'], -score['objective'])), label
+
+    def update_model(self, model_dir, new_trees=None, mode='warm_start'):
+        """
+        Incrementally update a saved model with the rows appended to the
+        dataset since it was trained, instead of retraining from scratch.
+
+        Only conditions the current model gets wrong on the new rows are
+        touched. In warm_start mode each of them gets more trees fitted on
+        the new rows alone: a forest gets enough for the new rows' share of
+        the vote to match their share of the data, boosting gets
+        UPDATE_TREES stages (new_trees overrides both). A condition whose
+        share of suitable foods in the new rows differs from the training
+        data (LABEL_SHIFT_Z), whose new trees fix none of its errors on the
+        new rows, or whose estimator cannot grow that way, is refitted on the
+        whole dataset instead, like every affected condition with
+        mode='refit'. The scaler is
+        kept, so existing trees stay valid. Returns True when there is an
+        updated model to save.
+        """
+        print("\n" + "="*70)
+        print("♻  INCREMENTAL MODEL UPDATE")
+        print("="*70)
+
+        if IN_COLAB:
+            model_dir = os.path.join(BASE_PATH, model_dir)
+
+        artifact_path = os.path.join(model_dir, ARTIFACT_FILE)
+        try:
+            header, _ = read_header(artifact_path)
+        except FileNotFoundError:
+            print(f"✗ No model artifact at {artifact_path}; run a full training first.")
+            return False
+        metadata = header['metadata']
+        trained_on = metadata.get('dataset')
+        if trained_on is None:
+            print("✗ The model does not record the dataset it was trained on; "
+                  "run a full training first.")
+            return False
+
+        # The rows the model has seen must be an unchanged prefix of the file
+        dataset_file = self._dataset_file()
+        if not os.path.exists(dataset_file):
+            print(f"✗ Dataset file not found: {dataset_file}")
+            return False
+        size = os.path.getsize(dataset_file)
+        if size < trained_on['bytes'] or \
+                dataset_fingerprint(dataset_file, trained_on['bytes'])['sha256'] != trained_on['sha256']:
+            print("✗ Rows the model was trained on were changed or removed; run a full training.")
+            return False
+        if size == trained_on['bytes']:
+            print(f"✓ No new rows since version {header['model_version']}; the model is up to date.")
+            return False
+
+        # Parse only the appended rows, under the file's header line
+        with open(dataset_file, 'rb') as f:
+            header_line = f.readline()
+            f.seek(trained_on['bytes'])
+            new_df = pd.read_csv(io.BytesIO(header_line + f.read()))
+        add_labels(new_df)
+
+        self.model = joblib.load(os.path.join(model_dir, 'food_recommendation_model.pkl'))
+        self.scaler = joblib.load(os.path.join(model_dir, 'feature_scaler.pkl'))
+        self.feature_cols = joblib.load(os.path.join(model_dir, 'feature_columns.pkl'))
+        self.target_cols = list(metadata.get('target_columns', TARGET_COLUMNS))
+
+        X_new = self.scaler.transform(features_from_frame(new_df, self.feature_cols))
+        y_new = new_df[self.target_cols].to_numpy()
+        before = self.model.predict(X_new)
+
+        print(f"✓ Model version {header['model_version']} "
+              f"({type(self.model.estimators_[0]).__name__}, {trained_on['rows']} rows)")
+        print(f"✓ New rows: {len(new_df)}")
+
+        old_rates = trained_on.get('label_rates')
+        if old_rates is None:
+            # Recorded since label rates were added to the metadata
+            with open(dataset_file, 'rb') as f:
+                old_df = pd.read_csv(io.BytesIO(f.read(trained_on['bytes'])))
+            add_labels(old_df)
+            old_rates = label_rates(old_df[self.target_cols], self.target_cols)
+        new_rates = label_rates(y_new, self.target_cols)
+
+        added = {}
+        refit = []
+        shifted = []
+        outvoted = []
+        for idx, condition in enumerate(self.target_cols):
+            if np.array_equal(before[:, idx], y_new[:, idx]):
+                continue
+            estimator = self.model.estimators_[idx]
+            old_rate = old_rates[condition]
+            spread = np.sqrt(max(old_rate * (1 - old_rate), 1e-12) / len(new_df))
+            if abs(new_rates[condition] - old_rate) / spread > LABEL_SHIFT_Z:
+                # Trees fitted on the new rows would be outvoted by the old ones
+                shifted.append(condition)
+                refit.append(idx)
+            elif mode == 'warm_start' and 'warm_start' in estimator.get_params() and \
+                    np.array_equal(np.unique(y_new[:, idx]), estimator.classes_):
+                # New trees on the new rows only need both classes among them
+                n_trees = new_trees
+                if n_trees is None and hasattr(estimator, 'learning_rate'):
+                    n_trees = UPDATE_TREES
+                elif n_trees is None:
+                    # Forest votes are averaged: new trees / all trees = new rows / all rows
+                    n_trees = max(1, int(np.ceil(estimator.n_estimators * len(new_df) / trained_on['rows'])))
+                estimator.set_params(warm_start=True, n_estimators=estimator.n_estimators + n_trees)
+                estimator.fit(X_new, y_new[:, idx])
+                estimator.set_params(warm_start=False)
+                errors_before = np.count_nonzero(before[:, idx] != y_new[:, idx])
+                if np.count_nonzero(estimator.predict(X_new) != y_new[:, idx]) < errors_before:
+                    added[condition] = n_trees
+                else:
+                    # Where the new rows disagree with the old ones the old trees win the vote
+                    outvoted.append(condition)
+                    refit.append(idx)
+            else:
+                refit.append(idx)
+
+        if refit:
+            # Refitted on every row, old and new, with the existing scaler
+            df = pd.read_csv(dataset_file)
+            add_labels(df)
+            X_all = self.scaler.transform(features_from_frame(df, self.feature_cols))
+            y_all = df[self.target_cols].to_numpy()
+            estimators, _ = self._fit_conditions([(self.model.estimator, idx) for idx in refit],
+                                                 X_all, y_all)
+            for idx, estimator in zip(refit, estimators):
+                self.model.estimators_[idx] = estimator
+
+        after = self.model.predict(X_new)
+        accuracy = {'before': float(accuracy_score(y_new, before)), 'after': float(accuracy_score(y_new, after))}
+        print(f"\n✓ Accuracy on the new rows: {accuracy['before']:.4f} -> {accuracy['after']:.4f}")
+        for idx, condition in enumerate(self.target_cols):
+            if condition in added:
+                action = f"+{added[condition]} trees"
+            elif condition in shifted:
+                action = (f"refitted, suitable share {old_rates[condition]:.3f} -> "
+                          f"{new_rates[condition]:.3f}")
+            elif condition in outvoted:
+                action = "refitted, new trees fixed no errors"
+            elif idx in refit:
+                action = "refitted"
+            else:
+                action = "unchanged"
+            print(f"  {condition:30s}: {accuracy_score(y_new[:, idx], before[:, idx]):.4f} -> "
+                  f"{accuracy_score(y_new[:, idx], after[:, idx]):.4f} ({action})")
+
+        total_rows = trained_on['rows'] + len(new_df)
+        rates = {
+            col: (old_rates[col] * trained_on['rows'] + new_rates[col] * len(new_df)) / total_rows
+            for col in self.target_cols
+        }
+        self.metadata = {
+            **metadata,
+            'training_samples': metadata.get('training_samples', 0) + len(new_df),
+            'dataset': {'rows': total_rows, **dataset_fingerprint(dataset_file, size), 'label_rates': rates},
+            'lineage': metadata.get('lineage', []) + [{
+                'mode': mode,
+                'parent_version': header['model_version'],
+                'rows': total_rows,
+                'new_rows': len(new_df),
+                'trees_added': added,
+                'refitted': [self.target_cols[idx] for idx in refit],
+                'label_shift': shifted,
+                'new_trees_fixed_nothing': outvoted,
+                'new_rows_accuracy': accuracy,
+                'trained_at': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')
+            }]
+        }
+        return True
+
+    def evaluate_model(self, plots=True):
         """Evaluate model performance"""
         print("\n" + "="*70)
         print("📊 MODEL EVALUATION")
@@ -413,12 +1021,13 @@ class FoodRecommendationModel:
             )
 
         # Feature importance (RandomForest / Tree / GB)
-        if hasattr(self.model.estimators_[0], 'feature_importances_'):
+        if plots and hasattr(self.model.estimators_[0], 'feature_importances_'):
             self._plot_feature_importance()
 
     def _plot_feature_importance(self):
         """Plot feature importance"""
         print("\n📊 Creating feature importance visualization...")
+        plt, _ = load_plotting()
 
         importances = self.model.estimators_[0].feature_importances_
         feature_importance_df = pd.DataFrame({
@@ -445,8 +1054,14 @@ class FoodRecommendationModel:
         print(f"  ✓ Saved: {viz_path}")
         plt.close()
 
-    def save_models(self, output_dir='models'):
-        """Save trained models and preprocessing objects"""
+    def save_models(self, output_dir='models', compact=False, tree_subset=False,
+                    max_accuracy_loss=MAX_ACCURACY_LOSS):
+        """
+        Save trained models and preprocessing objects. With compact the
+        serving artifact is compacted (model_compaction.py); with tree_subset
+        it also drops trees, chosen on the validation set within
+        max_accuracy_loss per condition and overall.
+        """
         print("\n" + "="*70)
         print("💾 SAVING MODELS")
         print("="*70)
@@ -460,48 +1075,133 @@ class FoodRecommendationModel:
         model_path = os.path.join(output_dir, 'food_recommendation_model.pkl')
         scaler_path = os.path.join(output_dir, 'feature_scaler.pkl')
         features_path = os.path.join(output_dir, 'feature_columns.pkl')
+        artifact_path = os.path.join(output_dir, ARTIFACT_FILE)
 
         joblib.dump(self.model, model_path)
         joblib.dump(self.scaler, scaler_path)
         joblib.dump(self.feature_cols, features_path)
 
+        # Full training starts a new lineage; update_model() extends the parent's
+        lineage = [{
+            'mode': 'full',
+            'rows': self.dataset_info['rows'] if self.dataset_info else None,
+            'trained_at': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')
+        }]
+
+        # Single serving artifact: flattened trees with the scaler folded into
+        # their thresholds (takes raw features), feature columns, metadata
+        arrays = compile_model(self.model, self.scaler, self.feature_cols)
+        if compact:
+            arrays = self._compact_arrays(arrays, model_path, tree_subset, max_accuracy_loss)
+
+        header = save_artifact(
+            artifact_path,
+            arrays,
+            metadata={
+                'model_type': type(self.model.estimators_[0]).__name__,
+                'sklearn_version': sklearn.__version__,
+                'feature_columns': self.feature_cols,
+                'category_encoding': CATEGORY_ENCODING,
+                'target_columns': self.target_cols,
+                'training_samples': int(len(self.X_train)) if self.X_train is not None else None,
+                'dataset': self.dataset_info,
+                'lineage': lineage,
+                **self.metadata
+            }
+        )
+
         print(f"\n✓ Models saved successfully!")
         print(f"  - Model:   {model_path}")
         print(f"  - Scaler:  {scaler_path}")
         print(f"  - Features:{features_path}")
+        print(f"  - Artifact:{artifact_path} (version {header['model_version']})")
 
         if IN_COLAB:
             print("\n📁 Models are in your Google Drive under:")
             print(f"  My Drive / {os.path.relpath(output_dir, BASE_PATH)}")
 
+    def _compact_arrays(self, arrays, model_path, tree_subset, max_accuracy_loss):
+        """Compacted artifact arrays, with a size / load time / test accuracy report"""
+        X_test = np.asarray(self.X_test, dtype=np.float64)
+        y_test = np.asarray(self.y_test)
+        if tree_subset and self.X_val is None:
+            raise ValueError("Choosing a tree subset needs a validation set (validation_size > 0)")
+        if tree_subset:
+            print(f"\n🗜  Compacting the serving artifact (trees chosen on {len(self.X_val)} validation "
+                  f"rows, max accuracy loss {max_accuracy_loss} per condition and overall)...")
+            compact, summary = compact_model(arrays, np.asarray(self.X_val, dtype=np.float64),
+                                             np.asarray(self.y_val), max_accuracy_loss)
+        else:
+            print("\n🗜  Compacting the serving artifact (all trees kept)...")
+            compact, summary = compact_model(arrays)
+
+        def median_seconds(fn, repeat=5):
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                fn()
+                timings.append(time.perf_counter() - start)
+            return float(np.median(timings))
+
+        # Both artifacts are written to measure their size and load time
+        rows = [('pickle (scikit-learn)', os.path.getsize(model_path),
+                 median_seconds(lambda: joblib.load(model_path)), self.model.predict(self.X_test_scaled))]
+        for label, candidate in (('artifact', arrays), ('compact artifact', compact)):
+            path = f"{model_path}.{os.getpid()}.measure"
+            try:
+                save_artifact(path, candidate)
+                rows.append((label, os.path.getsize(path), median_seconds(lambda: load_model(path)),
+                             CompiledForest(candidate).predict(X_test)))
+            finally:
+                os.remove(path)
+
+        print(f"\n  Exact-match accuracy on the {len(X_test)} test rows (not used to choose trees):")
+        print(f"\n  {'':22s} {'size KB':>9s} {'load ms':>8s} {'accuracy':>9s}")
+        for label, size, seconds, predictions in rows:
+            print(f"  {label:22s} {size / 1024:9.1f} {seconds * 1000:8.2f} "
+                  f"{accuracy_score(y_test, predictions):9.4f}")
+        agreement = float((rows[2][3] == rows[1][3]).all(axis=1).mean())
+        print(f"\n  Nodes: {summary['nodes_before']} -> {summary['nodes_after_pruning']} (pruned) "
+              f"-> {summary['nodes_after']} (tree subset)")
+        print(f"  Trees per condition: {summary['trees_before']} -> {summary['trees_after']}")
+        print(f"  Test rows predicted like the exact artifact: {agreement:.2%}")
+
+        self.metadata['compaction'] = {
+            **summary,
+            'test_accuracy': accuracy_score(y_test, rows[2][3]),
+            'test_accuracy_exact': accuracy_score(y_test, rows[1][3]),
+            'agreement': agreement
+        }
+        return compact
+
     def test_prediction(self):
         """Test the model with sample predictions"""
         print("\n" + "="*70)
         print("🧪 TESTING PREDICTIONS")
         print("="*70)
 
-        # Example test cases (you can adjust categories according to your encoding)
+        # Example test cases, encoded by the same featurizer as the ML service
         test_foods = [
             {
                 'name': 'Grilled Chicken Salad',
                 'calories': 250,
                 'protein': 35,
                 'carbohydrates': 15,
-                'category_encoded': 6  # Example code
+                'category': 'Lean Protein'
             },
             {
                 'name': 'Fried Chicken Burger',
                 'calories': 680,
                 'protein': 28,
                 'carbohydrates': 52,
-                'category_encoded': 2
+                'category': 'High-Protein'
             },
             {
                 'name': 'Vegetable Soup',
                 'calories': 120,
                 'protein': 5,
                 'carbohydrates': 18,
-                'category_encoded': 8
+                'category': 'Soups'
             }
         ]
 
@@ -511,12 +1211,7 @@ class FoodRecommendationModel:
                   f"{food['protein']}g protein, "
                   f"{food['carbohydrates']}g carbs")
 
-            features = np.array([[
-                food['calories'],
-                food['protein'],
-                food['carbohydrates'],
-                food['category_encoded']
-            ]])
+            features = features_from_frame(pd.DataFrame([food]), self.feature_cols)
 
             features_scaled = self.scaler.transform(features)
             predictions = self.model.predict(features_scaled)[0]
@@ -527,39 +1222,111 @@ class FoodRecommendationModel:
                 print(f"    {condition:30s}: {status}")
 
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Train the Olive Foods recommendation model')
+    parser.add_argument('--headless', action='store_true',
+                        help='skip exploratory analysis and plots (no matplotlib import)')
+    parser.add_argument('--dataset', default=DATASET_NAME, help='dataset CSV')
+    parser.add_argument('--output-dir', default='Olive-Foods-ML-models',
+                        help='directory for the model files')
+    parser.add_argument('--n-jobs', type=int, default=N_JOBS,
+                        help='total CPU cores for training (default: TRAIN_N_JOBS or all)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='always parse and preprocess the CSV; do not read or write the dataset cache')
+    parser.add_argument('--search', action='store_true',
+                        help='successive-halving hyperparameter search instead of the fixed candidates')
+    parser.add_argument('--folds', type=int, default=5, help='cross-validation folds of the search')
+    parser.add_argument('--latency-weight', type=float, default=LATENCY_WEIGHT,
+                        help='accuracy traded per 1000 leaf mask words of inference cost in the search')
+    parser.add_argument('--compact', action='store_true',
+                        help='compact the serving artifact: pruned trees, float32/int16 arrays')
+    parser.add_argument('--compact-trees', action='store_true',
+                        help='also keep only the first trees of each condition (implies --compact); '
+                             'holds out VALIDATION_SIZE of the training rows to choose them')
+    parser.add_argument('--max-accuracy-loss', type=float, default=MAX_ACCURACY_LOSS,
+                        help='validation accuracy, per condition and overall, the tree subset may give up')
+    parser.add_argument('--update', action='store_true',
+                        help='update the model in --output-dir with the rows appended to the dataset')
+    parser.add_argument('--update-mode', choices=['warm_start', 'refit'], default='warm_start',
+                        help='add trees fitted on the new rows, or refit the affected conditions')
+    parser.add_argument('--new-trees', type=int, default=None,
+                        help='trees added per affected condition in warm_start mode (default: a '
+                             "forest's share matching the new rows, boosting: UPDATE_TREES)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
     """Main training pipeline"""
+    args = parse_args(argv)
+    timings = {'startup': time.perf_counter() - STARTED_AT}
+
+    def stage(name, fn, *fn_args, **fn_kwargs):
+        """Run one pipeline stage and record its wall-clock time"""
+        start = time.perf_counter()
+        result = fn(*fn_args, **fn_kwargs)
+        timings[name] = time.perf_counter() - start
+        return result
+
     print("\n" + "="*70)
     print("🍽  OLIVE FOODS - ML MODEL TRAINING")
     print("="*70)
     print("\nHealth-Based Food Recommendation System")
     print("Training machine learning model for personalized food recommendations")
+    if args.headless:
+        print("Headless mode: exploratory analysis and plots skipped")
     print("="*70)
 
-    trainer = FoodRecommendationModel(dataset_path=DATASET_NAME)
+    def print_timings():
+        print("\n" + "="*70)
+        print("⏱  STAGE TIMINGS")
+        print("="*70)
+        for name, seconds in timings.items():
+            print(f"  {name:12s}: {seconds:8.2f} s")
+        print(f"  {'total':12s}: {time.perf_counter() - STARTED_AT:8.2f} s")
+
+    trainer = FoodRecommendationModel(dataset_path=args.dataset, n_jobs=args.n_jobs,
+                                      use_cache=not args.no_cache,
+                                      validation_size=VALIDATION_SIZE if args.compact_trees else 0.0)
+
+    # Incremental update of an existing model with the appended rows
+    if args.update:
+        if stage('update', trainer.update_model, args.output_dir,
+                 new_trees=args.new_trees, mode=args.update_mode):
+            stage('save', trainer.save_models, output_dir=args.output_dir)
+        print_timings()
+        return
 
     # Load data
-    if not trainer.load_data():
+    if not stage('load', trainer.load_data):
         print("\n❌ Training aborted due to data loading error.")
         sys.exit(1)
 
     # Explore data
-    trainer.explore_data()
+    if not args.headless:
+        stage('explore', trainer.explore_data)
 
     # Preprocess data
-    trainer.preprocess_data()
+    stage('preprocess', trainer.preprocess_data)
 
     # Train models
-    results, best_model = trainer.train_models()
+    if args.search:
+        results, best_model = stage('search', trainer.search_models, n_splits=args.folds,
+                                    latency_weight=args.latency_weight)
+    else:
+        results, best_model = stage('train', trainer.train_models)
 
     # Evaluate model
-    trainer.evaluate_model()
+    stage('evaluate', trainer.evaluate_model, plots=not args.headless)
 
     # Save models
-    trainer.save_models(output_dir='Olive-Foods-ML-models')
+    stage('save', trainer.save_models, output_dir=args.output_dir,
+          compact=args.compact or args.compact_trees, tree_subset=args.compact_trees,
+          max_accuracy_loss=args.max_accuracy_loss)
 
     # Test predictions
-    trainer.test_prediction()
+    stage('test', trainer.test_prediction)
+
+    print_timings()
 
     print("\n" + "="*70)
     print("✅ MODEL TRAINING COMPLETED SUCCESSFULLY!")
@@ -0,0 +1,286 @@
+"""
+Content negotiation for the ML API: orjson, MessagePack, gzip and zstd
+
+init_app() plugs into Flask's own extension points, so endpoints keep using
+request.json and jsonify():
+- WireJSONProvider encodes and decodes JSON with orjson, and answers with
+  MessagePack when the client prefers it (Accept: application/msgpack)
+- WireRequest accepts MessagePack bodies (Content-Type: application/msgpack)
+  and gzip or zstd compressed bodies (Content-Encoding)
+- check_request_body() rejects bodies over MAX_REQUEST_BYTES with a 413, on
+  the wire and after decompression, so a small compressed body cannot expand
+  without bound in a worker
+- compress_response() compresses large responses with zstd or gzip,
+  following Accept-Encoding
+
+Every codec is optional. Without orjson, msgpack or zstandard installed the
+service falls back to the standard JSON behaviour for that part.
+"""
+
+import gzip
+import json
+import zlib
+
+from flask import Request, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.exceptions import BadRequest, RequestEntityTooLarge, UnsupportedMediaType
+
+from config import Config
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+MSGPACK_MIMETYPE = 'application/msgpack'
+MSGPACK_MIMETYPES = (MSGPACK_MIMETYPE, 'application/x-msgpack')
+
+# Decompressed bytes produced per step while checking the size limit
+DECOMPRESS_CHUNK_SIZE = 1024 * 1024
+
+
+def _to_builtin(obj):
+    """NumPy scalars and arrays as plain Python values (msgpack default hook)"""
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
+def available_codecs():
+    """Which optional codecs are installed, e.g. for /health"""
+    return {
+        'orjson': orjson is not None,
+        'msgpack': msgpack is not None,
+        'zstd': zstandard is not None
+    }
+
+
+def dumps_line(obj):
+    """One compact NDJSON line as bytes"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=_to_builtin,
+                                option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_APPEND_NEWLINE)
+        except (TypeError, orjson.JSONEncodeError):
+            pass
+    return (json.dumps(obj, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+def prefers_msgpack():
+    """True when the current request asks for MessagePack over JSON"""
+    if msgpack is None or not has_request_context():
+        return False
+    accept = request.accept_mimetypes
+    quality = max(accept[mimetype] for mimetype in MSGPACK_MIMETYPES)
+    return quality > accept['application/json']
+
+
+class WireJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson, with MessagePack negotiation"""
+
+    def _orjson_option(self, indent=None):
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or set(kwargs) - {'separators', 'indent'}:
+            return super().dumps(obj, **kwargs)
+        try:
+            return orjson.dumps(
+                obj, default=self.default, option=self._orjson_option(kwargs.get('indent'))
+            ).decode('utf-8')
+        except (TypeError, orjson.JSONEncodeError):
+            # e.g. integers wider than 64 bits
+            return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            # The standard parser also accepts NaN, Infinity and huge integers
+            return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+
+        if prefers_msgpack():
+            response = self._app.response_class(
+                msgpack.packb(obj, default=_to_builtin, use_bin_type=True),
+                mimetype=MSGPACK_MIMETYPE
+            )
+            response.vary.add('Accept')
+            return response
+
+        pretty = (self.compact is None and self._app.debug) or self.compact is False
+        if orjson is None:
+            response = super().response(obj)
+        else:
+            try:
+                body = orjson.dumps(obj, default=self.default,
+                                    option=self._orjson_option(pretty) | orjson.OPT_APPEND_NEWLINE)
+            except (TypeError, orjson.JSONEncodeError):
+                return super().response(obj)
+            response = self._app.response_class(body, mimetype=self.mimetype)
+        if msgpack is not None:
+            response.vary.add('Accept')
+        return response
+
+
+def _too_large(max_size):
+    return RequestEntityTooLarge(f'Decompressed request body exceeds {max_size} bytes')
+
+
+def _gunzip(data, max_size):
+    """gzip.decompress that stops after max_size output bytes"""
+    chunks, size = [], 0
+    while data:
+        # One decompressor per gzip member, like gzip.decompress
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        while not decompressor.eof:
+            chunk = decompressor.decompress(data, max_size - size + 1)
+            size += len(chunk)
+            if size > max_size:
+                raise _too_large(max_size)
+            chunks.append(chunk)
+            data = decompressor.unconsumed_tail
+            if not chunk and not data:
+                raise EOFError('Compressed request body ended before the end-of-stream marker')
+        data = decompressor.unused_data
+    return b''.join(chunks)
+
+
+def _unzstd(data, max_size):
+    """zstd decompression of every frame that stops after max_size output bytes"""
+    chunks, size = [], 0
+    with zstandard.ZstdDecompressor().stream_reader(data, read_across_frames=True) as reader:
+        while True:
+            chunk = reader.read(DECOMPRESS_CHUNK_SIZE)
+            if not chunk:
+                return b''.join(chunks)
+            size += len(chunk)
+            if size > max_size:
+                raise _too_large(max_size)
+            chunks.append(chunk)
+
+
+def _decompress(data, encoding, max_size):
+    if encoding == 'gzip':
+        return _gunzip(data, max_size)
+    if encoding == 'zstd':
+        if zstandard is None:
+            raise UnsupportedMediaType('zstd request bodies need the zstandard package')
+        return _unzstd(data, max_size)
+    raise UnsupportedMediaType(f'Unsupported Content-Encoding: {encoding}')
+
+
+class WireRequest(Request):
+    """Request whose get_json() also reads MessagePack and compressed bodies"""
+
+    _wire_body = None
+
+    def get_json(self, force=False, silent=False, cache=True):
+        encoding = self.headers.get('Content-Encoding', '').strip().lower()
+        is_msgpack = self.mimetype in MSGPACK_MIMETYPES
+        if not is_msgpack and encoding in ('', 'identity'):
+            return super().get_json(force=force, silent=silent, cache=cache)
+
+        if cache and self._wire_body is not None:
+            return self._wire_body[0]
+        try:
+            data = self.get_data(cache=cache)
+            if encoding not in ('', 'identity'):
+                data = _decompress(data, encoding, Config.MAX_REQUEST_BYTES)
+            if is_msgpack:
+                if msgpack is None:
+                    raise UnsupportedMediaType('MessagePack request bodies need the msgpack package')
+                body = msgpack.unpackb(data, raw=False)
+            elif force or self.is_json:
+                body = self.json_module.loads(data)
+            else:
+                raise UnsupportedMediaType("Did not attempt to load JSON data because the request "
+                                           "Content-Type was not 'application/json'.")
+        except (UnsupportedMediaType, RequestEntityTooLarge):
+            if silent:
+                return None
+            raise
+        except Exception as e:
+            if silent:
+                return None
+            raise BadRequest(f'Failed to decode request body: {str(e)}')
+
+        if cache:
+            self._wire_body = (body,)
+        return body
+
+
+def check_request_body():
+    """
+    before_request hook: 413 for bodies over MAX_REQUEST_BYTES. Compressed and
+    MessagePack bodies are decoded here, before the view runs, so their
+    400 / 413 / 415 errors reach the client as such.
+    """
+    if request.content_length is not None and request.content_length > Config.MAX_REQUEST_BYTES:
+        raise RequestEntityTooLarge(f'Request body exceeds {Config.MAX_REQUEST_BYTES} bytes')
+    encoding = request.headers.get('Content-Encoding', '').strip().lower()
+    if request.mimetype in MSGPACK_MIMETYPES or (request.is_json and encoding not in ('', 'identity')):
+        request.get_json()
+
+
+def _pick_encoding():
+    accept = request.accept_encodings
+    zstd_quality = accept['zstd'] if zstandard is not None else 0
+    gzip_quality = accept['gzip']
+    if zstd_quality and zstd_quality >= gzip_quality:
+        return 'zstd'
+    if gzip_quality:
+        return 'gzip'
+    return None
+
+
+def compress_response(response):
+    """after_request hook: compress large, buffered responses"""
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < Config.COMPRESS_MIN_BYTES:
+        return response
+    encoding = _pick_encoding()
+    if encoding is None:
+        return response
+
+    if encoding == 'zstd':
+        data = zstandard.ZstdCompressor(level=Config.ZSTD_LEVEL).compress(data)
+    else:
+        data = gzip.compress(data, compresslevel=Config.GZIP_LEVEL, mtime=0)
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_app(app):
+    """Enable the fast codecs and response compression on a Flask app"""
+    app.json = WireJSONProvider(app)
+    app.request_class = WireRequest
+    app.config['MAX_CONTENT_LENGTH'] = Config.MAX_REQUEST_BYTES
+    app.before_request(check_request_body)
+    app.after_request(compress_response)
@@ -0,0 +1,47 @@
+"""
+Pre-fork (gunicorn) entry point
+
+With preload_app (gunicorn.conf.py) the master process imports this module
+once: app.py loads and warms the model, then warm_up() sends a request to
+every prediction endpoint, so lazily created state (Flask's first-request
+setup, JSON / compression codecs, NumPy kernels) exists before the workers
+are forked and is shared by all of them.
+
+Usage (from ml-service/):
+    gunicorn wsgi:application
+"""
+
+import app as service
+import metrics
+
+WARM_UP_FOODS = [
+    {'_id': '1', 'name': 'Grilled Chicken', 'category': 'Lean Protein',
+     'nutritionalInfo': {'calories': 250, 'protein': 35, 'carbohydrates': 15}},
+    {'_id': '2', 'name': 'Lentil Soup', 'category': 'Soups',
+     'nutritionalInfo': {'calories': 180, 'protein': 12, 'carbohydrates': 30}},
+    {'_id': '3', 'name': 'Brown Rice Bowl', 'category': 'Whole Grains',
+     'nutritionalInfo': {'calories': 420, 'protein': 10, 'carbohydrates': 60}}
+]
+
+
+def warm_up():
+    """Serve one request per prediction endpoint in this process"""
+    client = service.app.test_client()
+    client.get('/health')
+    client.post('/api/ml/predict-food-suitability', json=WARM_UP_FOODS[0])
+    client.post('/api/ml/predict-food-suitability/batch', json={'foods': WARM_UP_FOODS})
+    client.post('/api/ml/recommend-foods', json={
+        'healthProfile': {'conditions': {'diabetes': True, 'hypertension': True}},
+        'foods': WARM_UP_FOODS,
+        'topN': 2
+    })
+
+    # Warm-up requests are not traffic
+    service.ranking_cache.invalidate()
+    metrics.REGISTRY.reset()
+
+
+if service.model_store.active is not None:
+    warm_up()
+
+application = service.app